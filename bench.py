@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import functools
+import statistics
+import subprocess
+from types import SimpleNamespace
+from demo import BUILD_CONFIGS, transpile, cpp2exec, exec_path_for
+from src.lexer import Lexer
+from src.emitter import Emitter
+from src.parser import Parser
+from src.token import TokenType
+
+# --- Runtime benchmark suite ---
+# 將 benchmarks/*.itz 轉譯並以每個 BUILD_CONFIGS 建置，
+# 以固定輸入 (benchmarks/{name}.in 或 GENERATED_INPUTS) 重複執行，記錄執行時間中位數與 peak RSS
+# (POSIX 上透過 benchmarks/rusage.cpp 量測)，並與 benchmarks/baseline.json 比較，
+# 明顯變慢 (或記憶體變多) 時以 exit code 1 結束。
+BENCH_DIR = "benchmarks"
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+def generate_numbers(path, count=10**7):
+    """第一行為數量，接著 count 個 [0, 10^9) 的整數 (固定亂數種子)"""
+    rng = random.Random(42)
+    with open(path, "w") as f:
+        f.write(f"{count}\n")
+        for _ in range(count // 100000):
+            f.write("\n".join(str(rng.randrange(10**9)) for _ in range(100000)))
+            f.write("\n")
+
+def generate_keys(path, n, queries):
+    """第一行為 "n queries"，接著 n 個不重複的 [0, 10^9) 整數鍵 (固定亂數種子)"""
+    rng = random.Random(7)
+    with open(path, "w") as f:
+        f.write(f"{n} {queries}\n")
+        f.write("\n".join(str(k) for k in rng.sample(range(10**9), n)))
+        f.write("\n")
+
+def generate_records(path, n=10**6, steps=10**7):
+    """第一行為 "n steps"，接著依欄位排列的 4n 個 [-1000, 1000] 整數 (x..., y..., vx..., vy...)"""
+    rng = random.Random(11)
+    with open(path, "w") as f:
+        f.write(f"{n} {steps}\n")
+        for _ in range(4):
+            f.write("\n".join(str(rng.randint(-1000, 1000)) for _ in range(n)))
+            f.write("\n")
+
+def random_expression(rng, depth):
+    """隨機的算術運算式 (變數 a..h、數字、括號、一元負號與所有二元運算子)"""
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice("abcdefgh") if rng.random() < 0.6 else str(rng.randrange(1, 100))
+    op = rng.choice(["+", "-", "*", "/", "//", "%"])
+    left = random_expression(rng, depth - 1)
+    right = random_expression(rng, depth - 1)
+    if rng.random() < 0.3:
+        return f"-({left} {op} {right})"
+    return f"({left} {op} {right})" if rng.random() < 0.5 else f"{left} {op} {right}"
+
+def generate_expressions(path, lines=2000):
+    """轉譯速度用的 .itz: 大量的算術運算式與 IF / WHILE 條件 (固定亂數種子)"""
+    rng = random.Random(3)
+    with open(path, "w") as f:
+        for name in "abcdefgh":
+            f.write(f"DEF {name} = {rng.randrange(1, 100)}\n")
+        for i in range(lines):
+            if i % 10 == 0:
+                f.write(f"IF {random_expression(rng, 3)} >= {random_expression(rng, 3)} THEN\n")
+                f.write(f"    {rng.choice('abcdefgh')} = {random_expression(rng, 4)}\n")
+                f.write("ENDIF\n")
+            else:
+                f.write(f"{rng.choice('abcdefgh')} = {random_expression(rng, 5)}\n")
+
+# 太大而不放進版本控制的輸入: 名稱 -> {變體: (results/ 下的檔名, 產生函式)}
+# 變體 "" 的結果記為 {name}，其他記為 {name}.{變體}
+KEYS_1E5 = ("bench_keys_1e5.in", functools.partial(generate_keys, n=10**5, queries=20000))
+KEYS_1E6 = ("bench_keys_1e6.in", functools.partial(generate_keys, n=10**6, queries=2000))
+GENERATED_INPUTS = {
+    "stdin": {"": ("bench_numbers.in", generate_numbers)},
+    "stdin_array": {"": ("bench_numbers.in", generate_numbers)},
+    "lookup_dict": {"1e5": KEYS_1E5, "1e6": KEYS_1E6},
+    "lookup_scan": {"1e5": KEYS_1E5, "1e6": KEYS_1E6},
+    "records": {"": ("bench_records.in", generate_records)},
+    "parallel_arrays": {"": ("bench_records.in", generate_records)},
+}
+
+# 低於這個差距視為量測雜訊，不算退步
+MIN_TIME_DELTA = 0.005 # 秒
+MIN_RSS_DELTA = 1024   # KB
+
+def inputs_for(name):
+    """
+    回傳 [(結果名稱, 輸入檔路徑)]: benchmarks/{name}.in，或第一次使用時產生的 results/ 輸入檔
+    """
+    if name not in GENERATED_INPUTS:
+        return [(name, os.path.abspath(os.path.join(BENCH_DIR, f"{name}.in")))]
+    inputs = []
+    for variant, (filename, generator) in GENERATED_INPUTS[name].items():
+        path = os.path.abspath(os.path.join("results", filename))
+        if not os.path.exists(path):
+            print(f"  [Generating] {path}...")
+            generator(path)
+        inputs.append((f"{name}.{variant}" if variant else name, path))
+    return inputs
+
+def build_launcher():
+    """
+    編譯 benchmarks/rusage.cpp (POSIX)，回傳執行檔路徑；不支援的平台回傳 None
+    """
+    if platform.system() == "Windows":
+        return None
+    launcher_path = os.path.abspath(os.path.join("results", "rusage"))
+    cmd = ["g++", "-O2", os.path.join(BENCH_DIR, "rusage.cpp"), "-o", launcher_path]
+    try:
+        subprocess.run(cmd, check=True)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        print(f"  [Warning] Cannot build rusage launcher, peak RSS disabled: {e}")
+        return None
+    return launcher_path
+
+def run_once(exec_path, input_path, work_dir, launcher):
+    """
+    執行一次，回傳 (秒數, peak RSS KB)；沒有 launcher 時 RSS 為 None
+    """
+    with open(input_path, "r") as stdin:
+        if launcher is None:
+            start = time.perf_counter()
+            returncode = subprocess.run([exec_path], stdin=stdin, stdout=subprocess.DEVNULL, cwd=work_dir).returncode
+            elapsed, rss = time.perf_counter() - start, None
+        else:
+            usage_path = os.path.join(work_dir, "rusage.txt")
+            cmd = [launcher, usage_path, exec_path]
+            returncode = subprocess.run(cmd, stdin=stdin, stdout=subprocess.DEVNULL, cwd=work_dir).returncode
+            with open(usage_path, "r") as f:
+                seconds, rss = f.read().split()
+            elapsed, rss = float(seconds), int(rss)
+            if platform.system() == "Darwin":
+                rss //= 1024 # macOS 回傳 bytes
+    if returncode != 0:
+        raise RuntimeError(f"{exec_path} exited with code {returncode}")
+    return elapsed, rss
+
+def build_benchmark(name, configs):
+    """轉譯 benchmarks/{name}.itz 並以各建置設定編譯，回傳是否成功"""
+    cpp_filename = f"bench_{name}.cpp"
+    print(f"Compiling: {name}.itz -> results/{cpp_filename}")
+    if transpile(os.path.join(BENCH_DIR, f"{name}.itz"), os.path.join("results", cpp_filename)) is None:
+        return False
+    return all(cpp2exec(cpp_filename, config) for config in configs)
+
+def run_benchmarks(names, configs, runs):
+    results = {}
+    launcher = build_launcher()
+    for name in names:
+        if not build_benchmark(name, configs):
+            sys.exit(f"[Error] Failed to build benchmark '{name}'")
+        for label, input_path in inputs_for(name):
+            for config in configs:
+                exec_path = os.path.abspath(exec_path_for(f"bench_{name}", config))
+                # 在暫存資料夾執行，避免 FWRITE 的檔案留在專案中
+                with tempfile.TemporaryDirectory() as work_dir:
+                    run_once(exec_path, input_path, work_dir, launcher) # warm-up
+                    samples = [run_once(exec_path, input_path, work_dir, launcher) for _ in range(runs)]
+                times = [t for t, _ in samples]
+                rss = [r for _, r in samples if r is not None]
+                results[f"{label}/{config}"] = {
+                    "median_s": statistics.median(times),
+                    "peak_rss_kb": max(rss) if rss else None,
+                }
+                print(f"  [{label} {config}] median {statistics.median(times):.4f}s")
+        print("-" * 30)
+    return results
+
+def run_parse_benchmark(runs):
+    """
+    Parser 的速度: 先把產生的運算式程式 lex 成 token，再重複解析 (不含 Lexer 與寫檔)，記錄中位數
+    """
+    path = os.path.abspath(os.path.join("results", "bench_expressions.itz"))
+    if not os.path.exists(path):
+        print(f"  [Generating] {path}...")
+        generate_expressions(path)
+    with open(path, "r", encoding='utf-8') as f:
+        source_code = f.read()
+
+    lexer = Lexer(source_code)
+    tokens = [lexer.getToken()]
+    while tokens[-1].kind != TokenType.EOF:
+        tokens.append(lexer.getToken())
+
+    def parse_once():
+        replay = SimpleNamespace(getToken=functools.partial(next, iter(tokens), tokens[-1]))
+        start = time.perf_counter()
+        Parser(replay, Emitter(os.devnull)).program()
+        return time.perf_counter() - start
+
+    parse_once() # warm-up
+    median = statistics.median(parse_once() for _ in range(runs))
+    print(f"  [parse expressions] median {median:.4f}s ({len(tokens) / median:,.0f} tokens/s)")
+    return {"parse_expressions/parser": {"median_s": median, "peak_rss_kb": None}}
+
+def compare(results, baseline, threshold):
+    """印出對照表，回傳退步的項目"""
+    regressions = []
+    print(f"{'benchmark':<28}{'median (s)':>12}{'baseline':>12}{'change':>9}{'RSS (KB)':>11}{'baseline':>11}")
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<28}{cur['median_s']:>12.4f}{'-':>12}{'new':>9}{str(cur['peak_rss_kb']):>11}{'-':>11}")
+            continue
+        change = cur["median_s"] / base["median_s"] - 1
+        print(f"{key:<28}{cur['median_s']:>12.4f}{base['median_s']:>12.4f}{change:>+9.1%}"
+              f"{str(cur['peak_rss_kb']):>11}{str(base['peak_rss_kb']):>11}")
+        if change > threshold and cur["median_s"] - base["median_s"] > MIN_TIME_DELTA:
+            regressions.append(f"{key}: runtime {change:+.1%}")
+        if cur["peak_rss_kb"] and base["peak_rss_kb"] \
+                and cur["peak_rss_kb"] > base["peak_rss_kb"] * (1 + threshold) \
+                and cur["peak_rss_kb"] - base["peak_rss_kb"] > MIN_RSS_DELTA:
+            regressions.append(f"{key}: peak RSS {cur['peak_rss_kb']} KB (baseline {base['peak_rss_kb']} KB)")
+    return regressions
+
+def main():
+    all_names = sorted(os.path.splitext(f)[0] for f in os.listdir(BENCH_DIR) if f.endswith(".itz"))
+
+    arg_parser = argparse.ArgumentParser(description="Runtime benchmarks for itzCode-generated binaries")
+    arg_parser.add_argument("names", nargs="*", default=all_names, help="benchmarks to run (default: all)")
+    arg_parser.add_argument("--config", action="append", choices=list(BUILD_CONFIGS), help="build configuration (repeatable, default: all)")
+    arg_parser.add_argument("--runs", type=int, default=5, help="timed runs per benchmark (default: 5)")
+    arg_parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before failing (default: 0.10)")
+    arg_parser.add_argument("--parse", action="store_true", help="measure parser throughput instead of runtime")
+    arg_parser.add_argument("--update-baseline", action="store_true", help=f"store the results in {BASELINE_PATH}")
+    args = arg_parser.parse_args()
+
+    if not os.path.exists("results"):
+        os.makedirs("results")
+
+    if args.parse:
+        print("=== itzCode Parse Benchmark ===")
+        results = run_parse_benchmark(args.runs)
+    else:
+        print("=== itzCode Runtime Benchmarks ===")
+        results = run_benchmarks(args.names, args.config or list(BUILD_CONFIGS), args.runs)
+
+    try:
+        with open(BASELINE_PATH, "r", encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, "w", encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline updated: {BASELINE_PATH}")
+    elif regressions:
+        print("Regressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+// rusage.cpp: bench.py 的量測程式 (POSIX)
+// 用法: rusage <output-file> <program> [args...]
+// 由這個小行程 fork/exec 受測程式，peak RSS 才不會包含 Python 行程本身的記憶體
+#include <cstdio>
+#include <ctime>
+#include <sys/resource.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+int main(int argc, char **argv) {
+    if (argc < 3) {
+        fprintf(stderr, "usage: rusage <output-file> <program> [args...]\n");
+        return 2;
+    }
+
+    timespec start, end;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    pid_t pid = fork();
+    if (pid == 0) {
+        execv(argv[2], argv + 2);
+        _exit(127);
+    }
+
+    int status = 0;
+    rusage usage;
+    wait4(pid, &status, 0, &usage);
+    clock_gettime(CLOCK_MONOTONIC, &end);
+
+    FILE *f = fopen(argv[1], "w");
+    if (!f) return 2;
+    double elapsed = (end.tv_sec - start.tv_sec) + (end.tv_nsec - start.tv_nsec) / 1e9;
+    fprintf(f, "%.9f %ld\n", elapsed, usage.ru_maxrss);
+    fclose(f);
+    return WIFEXITED(status) ? WEXITSTATUS(status) : 1;
+}
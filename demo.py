@@ -1,27 +1,44 @@
 import os
 import sys
+import re
+import json
+import time
+import hashlib
 import subprocess
 import platform
 from src.lexer import Lexer
 from src.parser import Parser
 from src.emitter import Emitter
 
-def cpp2exec(cpp_filename):
+# 建置設定: 名稱 -> 額外的 g++ 參數 ("default" 與原本的指令相同)
+BUILD_CONFIGS = {
+    "default": [],
+    "O2": ["-O2"],
+    "O3-native": ["-O3", "-march=native"],
+}
+
+def exec_path_for(base_name, config="default"):
+    """
+    回傳 results/ 下的執行檔路徑，非 default 設定會加上後綴 (e.g., hello-O2)
     """
-    將 results/{cpp_filename} (e.g., hello.cpp) 編譯成執行檔
+    # 判斷作業系統決定副檔名
+    exe_ext = ".exe" if platform.system() == "Windows" else ""
+    suffix = "" if config == "default" else f"-{config}"
+    return os.path.join("results", f"{base_name}{suffix}{exe_ext}")
+
+def cpp2exec(cpp_filename, config="default"):
+    """
+    將 results/{cpp_filename} (e.g., hello.cpp) 以 BUILD_CONFIGS[config] 編譯成執行檔
     """
     # 設定路徑
     cpp_path = os.path.join("results", cpp_filename)
     base_name = os.path.splitext(cpp_filename)[0]
-    
-    # 判斷作業系統決定副檔名
-    exe_ext = ".exe" if platform.system() == "Windows" else ""
-    exec_path = os.path.join("results", f"{base_name}{exe_ext}")
+    exec_path = exec_path_for(base_name, config)
 
     print(f"  [Building] C++ -> Executable ({exec_path})...")
 
-    # 編譯指令: g++ -std=c++20 input.cpp -o output.exe
-    cmd = ["g++", "-std=c++20", cpp_path, "-o", exec_path]
+    # 編譯指令: g++ -std=c++20 [flags] input.cpp -o output.exe
+    cmd = ["g++", "-std=c++20", *BUILD_CONFIGS[config], cpp_path, "-o", exec_path]
 
     try:
         subprocess.run(cmd, check=True)
@@ -34,10 +51,201 @@ def cpp2exec(cpp_filename):
         print("  [Error] g++ not found. Please install MinGW (Windows) or GCC (Linux).")
         return False
 
+def cpp2obj(cpp_filename):
+    """
+    將 results/{cpp_filename} 單獨編譯成目的檔 results/{base}.o (separate compilation)
+    """
+    cpp_path = os.path.join("results", cpp_filename)
+    base_name = os.path.splitext(cpp_filename)[0]
+    obj_path = os.path.join("results", f"{base_name}.o")
+
+    print(f"  [Building] C++ -> Object ({obj_path})...")
+
+    cmd = ["g++", "-std=c++20", "-c", cpp_path, "-o", obj_path]
+
+    try:
+        subprocess.run(cmd, check=True)
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"  [Error] GCC Compilation failed: {e}")
+        return False
+    except FileNotFoundError:
+        print("  [Error] g++ not found. Please install MinGW (Windows) or GCC (Linux).")
+        return False
+
+def link_objects(obj_filenames, exec_name):
+    """
+    將 results/ 下的多個目的檔連結成執行檔
+    """
+    exec_path = exec_path_for(exec_name)
+    obj_paths = [os.path.join("results", f) for f in obj_filenames]
+
+    print(f"  [Linking] {len(obj_paths)} objects -> Executable ({exec_path})...")
+
+    cmd = ["g++", "-std=c++20", *obj_paths, "-o", exec_path]
+
+    try:
+        subprocess.run(cmd, check=True)
+        print("  [Success] Executable created.")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"  [Error] Linking failed: {e}")
+        return False
+    except FileNotFoundError:
+        print("  [Error] g++ not found. Please install MinGW (Windows) or GCC (Linux).")
+        return False
+
+# --- 多檔案程式 (IMPORT) 的增量建置 ---
+# results/.itzbuild.json 記錄每個模組的原始碼雜湊、相依模組、介面 (.h) 雜湊與目的檔雜湊，
+# 只有內容改變 (或其引入的 .h 改變) 的模組才會重新轉譯 / 重新編譯。
+BUILD_MANIFEST = os.path.join("results", ".itzbuild.json")
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def load_manifest():
+    try:
+        with open(BUILD_MANIFEST, "r", encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(manifest):
+    with open(BUILD_MANIFEST, "w", encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+def resolve_imports(importer_path, imports):
+    """IMPORT 的路徑以引入它的檔案所在資料夾為基準"""
+    base_dir = os.path.dirname(importer_path)
+    return [os.path.normpath(os.path.join(base_dir, path)) for path in imports]
+
+def transpile_module(module_path, manifest):
+    """
+    將模組 {name}.itz 轉譯為 results/{name}.cpp 與 results/{name}.h
+    原始碼雜湊沒變且輸出檔還在時直接沿用，回傳解析後的相依模組路徑 (失敗回傳 None)
+    """
+    name = os.path.splitext(os.path.basename(module_path))[0]
+    cpp_path = os.path.join("results", f"{name}.cpp")
+    header_path = os.path.join("results", f"{name}.h")
+
+    try:
+        with open(module_path, "r", encoding='utf-8') as f:
+            source_code = f.read()
+    except FileNotFoundError:
+        print(f"  [Error] Module '{module_path}' not found.")
+        return None
+
+    source_hash = text_hash(source_code)
+    entry = manifest.get(name, {})
+    if entry.get("path") == module_path and entry.get("source") == source_hash \
+            and os.path.exists(cpp_path) and os.path.exists(header_path):
+        print(f"  [Up-to-date] {module_path}")
+        return entry["imports"]
+
+    print(f"  [Module] {module_path} -> {cpp_path}")
+    lexer = Lexer(source_code)
+    emitter = Emitter(cpp_path)
+    parser = Parser(lexer, emitter, module=name)
+    parser.program()
+    emitter.writeFile()
+    emitter.writeHeader(header_path)
+
+    manifest[name] = {
+        "path": module_path,
+        "source": source_hash,
+        "imports": resolve_imports(module_path, parser.imports),
+        "interface": text_hash(emitter.headerText()),
+        "object": entry.get("object"),
+    }
+    return manifest[name]["imports"]
+
+def build_program(base_name, input_path, imports):
+    """
+    建置含 IMPORT 的程式: 走訪相依圖、轉譯有變動的模組、
+    只重新編譯內容或相依介面改變的目的檔，最後連結成執行檔
+    """
+    manifest = load_manifest()
+
+    # 1. 走訪相依圖 (DFS)，已走訪的模組不重複處理 (允許互相 IMPORT)
+    modules = {} # 模組名稱 -> 路徑
+    pending = resolve_imports(input_path, imports)
+    while pending:
+        module_path = pending.pop()
+        if module_path in modules.values():
+            continue
+        name = os.path.splitext(os.path.basename(module_path))[0]
+        if name == base_name or name in modules:
+            print(f"  [Error] Module name '{name}' is used by more than one file.")
+            return False
+        deps = transpile_module(module_path, manifest)
+        if deps is None:
+            return False
+        modules[name] = module_path
+        pending.extend(deps)
+
+    manifest[base_name] = {
+        "path": input_path,
+        "imports": resolve_imports(input_path, imports),
+        "object": manifest.get(base_name, {}).get("object"),
+    }
+
+    # 2. 目的檔雜湊 = .cpp 內容 + 直接引入之模組的介面雜湊
+    #    (.h 只含宣告，修改 FUNC 內容不會讓引入它的模組重新編譯)
+    relinked = False
+    obj_files = []
+    for name in [base_name, *modules]:
+        entry = manifest[name]
+        with open(os.path.join("results", f"{name}.cpp"), "r", encoding='utf-8') as f:
+            key = text_hash(f.read())
+        for dep in entry["imports"]:
+            dep_name = os.path.splitext(os.path.basename(dep))[0]
+            key = text_hash(key + manifest[dep_name]["interface"])
+
+        obj_file = f"{name}.o"
+        obj_files.append(obj_file)
+        if entry.get("object") == key and os.path.exists(os.path.join("results", obj_file)):
+            continue
+        if not cpp2obj(f"{name}.cpp"):
+            save_manifest(manifest)
+            return False
+        entry["object"] = key
+        relinked = True
+
+    save_manifest(manifest)
+
+    # 3. 有目的檔更新 (或執行檔不存在) 才重新連結
+    if not relinked and os.path.exists(exec_path_for(base_name)):
+        print("  [Up-to-date] Executable.")
+        return True
+    return link_objects(obj_files, base_name)
+
+def transpile(input_path, output_path, entry_point="main"):
+    """
+    將 input_path 的 .itz 轉譯為 output_path 的 .cpp，回傳 Parser (失敗回傳 None)
+    """
+    # 1. 讀取檔案
+    try:
+        with open(input_path, "r", encoding='utf-8') as f:
+            source_code = f.read()
+    except FileNotFoundError:
+        print(f"  [Error] File '{input_path}' not found.")
+        return None
+
+    # 2. 初始化編譯器模組
+    lexer = Lexer(source_code)
+    emitter = Emitter(output_path, entry_point)
+    parser = Parser(lexer, emitter)
+
+    # 3. 執行轉譯 (itz -> cpp)
+    parser.program()
+    emitter.writeFile()
+    print("  [Transpilation Success]")
+    return parser
+
 def compile_file(filename):
     """
     讀取 examples/{filename}，編譯並輸出到 results/{filename}.cpp
-    然後呼叫 g++ 轉為執行檔
+    然後呼叫 g++ 轉為執行檔 (有 IMPORT 時改為分開編譯各模組再連結)
     """
     input_path = os.path.join("examples", filename)
     
@@ -53,26 +261,16 @@ def compile_file(filename):
 
     print(f"Compiling: {filename} -> {output_path}")
 
-    # 1. 讀取檔案
     try:
-        with open(input_path, "r", encoding='utf-8') as f:
-            source_code = f.read()
-    except FileNotFoundError:
-        print(f"  [Error] File '{input_path}' not found.")
-        return False
-
-    # 2. 初始化編譯器模組
-    lexer = Lexer(source_code)
-    emitter = Emitter(output_path)
-    parser = Parser(lexer, emitter)
-
-    # 3. 執行轉譯 (itz -> cpp)
-    try:
-        parser.program()
-        emitter.writeFile()
-        print("  [Transpilation Success]")
+        parser = transpile(input_path, output_path)
+        if parser is None:
+            return False
         
-        # 4. 執行編譯 (cpp -> exe)
+        # 4. 多檔案程式: 增量建置各模組後連結
+        if parser.imports:
+            return build_program(base_name, input_path, parser.imports)
+
+        # 5. 執行編譯 (cpp -> exe)
         # 這裡直接呼叫 cpp2exec
         if cpp2exec(output_filename):
             return True
@@ -83,18 +281,27 @@ def compile_file(filename):
         print(f"  [Error] {e}")
         return False
 
-def run_all_demos():
+def list_examples():
     """
-    批次編譯 ./examples 資料夾下所有的 .itz 檔案
+    回傳 ./examples 資料夾下所有 .itz 檔名 (找不到時回傳 None)
     """
-    print("=== Batch Compiling All Examples ===")
     if not os.path.exists("examples"):
         print("Error: ./examples directory not found.")
-        return
+        return None
 
     files = [f for f in os.listdir("examples") if f.endswith(".itz")]
     if not files:
         print("No .itz files found in ./examples")
+        return None
+    return files
+
+def run_all_demos(files=None):
+    """
+    批次編譯 ./examples 資料夾下所有的 .itz 檔案 (或只編譯 files 中的檔案)
+    """
+    print("=== Batch Compiling All Examples ===")
+    files = files or list_examples()
+    if not files:
         return
 
     success_count = 0
@@ -105,6 +312,139 @@ def run_all_demos():
     
     print(f"Batch completed: {success_count}/{len(files)} files compiled successfully.")
 
+# --- Multicall (unity) 建置 ---
+# 每個程式的 main 轉為 namespace itz_{name} 中的 run()，全部放進同一個 .cpp，
+# 只呼叫一次 g++ (標準 header 只解析一次)。產生的執行檔像 busybox 一樣依程式名稱分派:
+#   results/multicall/itz-multicall <program>   或   results/multicall/<program> (symlink)
+MULTICALL_DIR = "multicall"
+MULTICALL_NAME = "itz-multicall"
+
+def multicall_namespace(name):
+    return "itz_" + re.sub(r'\W', '_', name)
+
+def write_multicall(programs, cpp_path):
+    """
+    programs: [(程式名稱, Emitter)]，合併成單一 translation unit 並加上分派用的 main
+    """
+    headers = []
+    runtime = {}
+    for _, emitter in programs:
+        for line in emitter.header.splitlines():
+            if line not in headers:
+                headers.append(line)
+        runtime.update(emitter.runtime)
+
+    with open(cpp_path, 'w') as writeFile:
+        writeFile.write("\n".join(headers) + "\n")
+        for runtime_code in runtime.values():
+            writeFile.write(runtime_code)
+        for name, emitter in programs:
+            writeFile.write(f"\n// ===== {name} =====\n")
+            writeFile.write(emitter.namespaceText(multicall_namespace(name)))
+
+        writeFile.write("\n// --- Dispatcher ---\n")
+        writeFile.write("int main(int argc, char **argv){\n")
+        writeFile.write("    static const struct { const char *name; int (*run)(void); } programs[] = {\n")
+        for name, _ in programs:
+            writeFile.write(f'        {{"{name}", {multicall_namespace(name)}::run}},\n')
+        writeFile.write("    };\n")
+        # 以 argv[0] 的檔名分派 (symlink)，否則使用第一個參數
+        writeFile.write("    string name = argc > 0 ? argv[0] : \"\";\n")
+        writeFile.write("    name = name.substr(name.find_last_of(\"/\\\\\") + 1);\n")
+        writeFile.write("    if (name.size() > 4 && name.substr(name.size() - 4) == \".exe\") name.resize(name.size() - 4);\n")
+        writeFile.write(f'    if (name == "{MULTICALL_NAME}" && argc > 1) name = argv[1];\n')
+        writeFile.write("    for (const auto &program : programs) {\n")
+        writeFile.write("        if (name == program.name) return program.run();\n")
+        writeFile.write("    }\n")
+        writeFile.write(f'    cerr << "usage: {MULTICALL_NAME} <program>" << endl << "programs:";\n')
+        writeFile.write("    for (const auto &program : programs) cerr << \" \" << program.name;\n")
+        writeFile.write("    cerr << endl;\n")
+        writeFile.write("    return 1;\n")
+        writeFile.write("}\n")
+
+def run_multicall():
+    """
+    將 ./examples 下所有 .itz 建置成單一 multicall 執行檔，回傳包含的程式名稱 (失敗回傳 None)
+    """
+    print("=== Multicall Build of All Examples ===")
+    files = list_examples()
+    if not files:
+        return None
+
+    output_dir = os.path.join("results", MULTICALL_DIR)
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    programs = []
+    for file in sorted(files):
+        base_name = os.path.splitext(file)[0]
+        # 各程式的單檔版本 (entry point 為 run) 也寫出來，方便除錯
+        output_path = os.path.join(output_dir, f"{base_name}.cpp")
+        print(f"Compiling: {file} -> {output_path}")
+        try:
+            parser = transpile(os.path.join("examples", file), output_path, entry_point="run")
+        except Exception as e:
+            print(f"  [Error] {e}")
+            continue
+        if parser is None:
+            continue
+        if parser.imports:
+            # 模組需另外連結目的檔，這類程式請用一般模式建置
+            print(f"  [Skip] {file} uses IMPORT, build it with: python demo.py {file}")
+            os.remove(output_path)
+            continue
+        programs.append((base_name, parser.emitter))
+
+    cpp_filename = os.path.join(MULTICALL_DIR, f"{MULTICALL_NAME}.cpp")
+    write_multicall(programs, os.path.join("results", cpp_filename))
+    if not cpp2exec(cpp_filename):
+        return None
+
+    # busybox 風格: 每個程式一個指向 multicall 執行檔的 symlink
+    if platform.system() != "Windows":
+        for name, _ in programs:
+            link_path = os.path.join(output_dir, name)
+            if os.path.lexists(link_path):
+                os.remove(link_path)
+            os.symlink(MULTICALL_NAME, link_path)
+
+    print(f"Multicall completed: {len(programs)}/{len(files)} programs in {exec_path_for(os.path.join(MULTICALL_DIR, MULTICALL_NAME))}")
+    return [name for name, _ in programs]
+
+def clean_build_state():
+    """
+    移除增量建置的 manifest 與目的檔，下一次建置不會沿用快取
+    """
+    if not os.path.exists("results"):
+        return
+    for file in os.listdir("results"):
+        if file.endswith(".o"):
+            os.remove(os.path.join("results", file))
+    if os.path.exists(BUILD_MANIFEST):
+        os.remove(BUILD_MANIFEST)
+
+def compare_builds():
+    """
+    比較逐檔建置 (--all) 與 multicall 建置的時間
+    兩邊都從乾淨的建置狀態開始，且只計入同一組程式 (multicall 會略過含 IMPORT 的程式)
+    """
+    clean_build_state()
+    start = time.perf_counter()
+    programs = run_multicall()
+    multicall = time.perf_counter() - start
+    if not programs:
+        return
+
+    clean_build_state()
+    start = time.perf_counter()
+    run_all_demos([f"{name}.itz" for name in programs])
+    per_program = time.perf_counter() - start
+
+    print(f"=== Build Time Comparison ({len(programs)} programs) ===")
+    print(f"  Per-program .cpp : {per_program:.2f}s")
+    print(f"  Multicall binary : {multicall:.2f}s")
+    print(f"  Speedup          : {per_program / multicall:.2f}x")
+
 def main():
     print("--- itzCode Tiny Compiler Driver ---")
 
@@ -112,15 +452,21 @@ def main():
         print("Usage:")
         print("  Compile one file:  python demo.py <filename.itz>")
         print("  Compile all files: python demo.py --all")
+        print("  Multicall build:   python demo.py --multicall")
+        print("  Compare builds:    python demo.py --compare-builds")
         return
 
     arg = sys.argv[1]
 
     if arg == "--all":
         run_all_demos()
+    elif arg == "--multicall":
+        run_multicall()
+    elif arg == "--compare-builds":
+        compare_builds()
     else:
         # 編譯單一檔案
         compile_file(arg)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,36 +1,140 @@
 # src/emitter.py
 class Emitter:
-    def __init__(self, fullPath):
+    def __init__(self, fullPath, entry_point="main"):
         self.fullPath = fullPath
+        self.entry_point = entry_point # [新增] multicall 模式下改為 run，避免與 main 衝突
         self.header = ""
-        self.functions = "" # [新增] 存放函式定義
-        self.main = ""      # [新增] 存放主程式邏輯
+        # [新增] 函式定義 (functions) 與主程式邏輯 (main) 的緩衝區:
+        # 以片段串列累積，避免每次 emit 都複製整個字串 (大檔案時是 O(n^2))
+        self.buffers = {"functions": [], "main": []}
+        self.lengths = {"functions": 0, "main": 0}
+        self.declarations = "" # [新增] 模組對外公開的函式宣告 (寫入 .h)
+        self.runtime = {}      # [新增] 需要的 runtime 輔助程式碼 (名稱 -> 程式碼)，寫在 header 之後
         self.capture_mode = "main" # 當前寫入模式: "main" 或 "functions"
 
+    def bufferText(self, mode):
+        """合併緩衝區的片段並回傳完整字串"""
+        buffer = self.buffers[mode]
+        if len(buffer) > 1:
+            buffer[:] = ["".join(buffer)]
+        return buffer[0] if buffer else ""
+
+    def setBufferText(self, mode, code):
+        self.buffers[mode] = [code]
+        self.lengths[mode] = len(code)
+
+    @property
+    def functions(self):
+        return self.bufferText("functions")
+
+    @functions.setter
+    def functions(self, code):
+        self.setBufferText("functions", code)
+
+    @property
+    def main(self):
+        return self.bufferText("main")
+
+    @main.setter
+    def main(self, code):
+        self.setBufferText("main", code)
+
     def setCaptureMode(self, mode):
         """切換寫入模式: 'main' 或 'functions'"""
         self.capture_mode = mode
 
     def emit(self, code):
-        if self.capture_mode == "functions":
-            self.functions += code
-        else:
-            self.main += code
+        self.buffers[self.capture_mode].append(code)
+        self.lengths[self.capture_mode] += len(code)
 
     def emitLine(self, code):
-        if self.capture_mode == "functions":
-            self.functions += code + '\n'
-        else:
-            self.main += code + '\n'
+        self.emit(code + '\n')
+
+    def position(self):
+        """目前寫入緩衝區的長度 (給 rewind 使用)"""
+        return self.lengths[self.capture_mode]
+
+    def rewind(self, pos):
+        """捨棄 pos 之後輸出的程式碼 (編譯期求值後改寫呼叫)"""
+        self.take(pos)
+
+    def take(self, pos):
+        """取出 pos 之後輸出的程式碼，並從緩衝區移除 (只處理尾端的片段)"""
+        buffer = self.buffers[self.capture_mode]
+        length = self.lengths[self.capture_mode]
+        removed = []
+        while length > pos:
+            chunk = buffer.pop()
+            length -= len(chunk)
+            if length < pos:
+                buffer.append(chunk[:pos - length])
+                chunk = chunk[pos - length:]
+                length = pos
+            removed.append(chunk)
+        self.lengths[self.capture_mode] = length
+        return "".join(reversed(removed))
+
+    def replace(self, start, end, code):
+        """以 code 取代目前緩衝區 [start, end) 的程式碼 (遞迴消除時改寫 RETURN)"""
+        text = self.bufferText(self.capture_mode)
+        self.setBufferText(self.capture_mode, text[:start] + code + text[end:])
+
+    def rewriteFunctions(self, spans, live, inline):
+        """依 call graph 結果重組函式緩衝區: 移除用不到的函式，小函式加上 inline"""
+        code = ""
+        last = 0
+        for name, start, end in spans:
+            code += self.functions[last:start]
+            if name in live:
+                if name in inline:
+                    code += "inline "
+                code += self.functions[start:end]
+            last = end
+        code += self.functions[last:]
+        self.functions = code
 
     def headerLine(self, code):
         self.header += code + '\n'
 
+    def requireRuntime(self, name, code):
+        """加入 runtime 輔助程式碼 (同名只加入一次)"""
+        if name not in self.runtime:
+            self.runtime[name] = code
+
+    def declarationLine(self, code):
+        self.declarations += code + '\n'
+
+    def text(self):
+        # 組合順序: Header -> Runtime -> Functions -> Main
+        code = self.header
+        for runtime_code in self.runtime.values():
+            code += runtime_code
+        code += "\n// --- Functions ---\n"
+        code += self.functions
+        # 模組 (module) 沒有 main，只輸出函式
+        if self.main:
+            code += "\n// --- Main Program ---\n"
+            code += self.main
+        return code
+
     def writeFile(self):
         with open(self.fullPath, 'w') as writeFile:
-            # 組合順序: Header -> Functions -> Main
-            writeFile.write(self.header)
-            writeFile.write("\n// --- Functions ---\n")
-            writeFile.write(self.functions)
-            writeFile.write("\n// --- Main Program ---\n")
-            writeFile.write(self.main)
\ No newline at end of file
+            writeFile.write(self.text())
+
+    def namespaceText(self, namespace):
+        """multicall 模式: 將函式與進入點包在 namespace 中 (header 由呼叫端合併)"""
+        code = f"namespace {namespace} {{\n"
+        code += "\n// --- Functions ---\n"
+        code += self.functions
+        code += "\n// --- Main Program ---\n"
+        code += self.main
+        code += f"}} // namespace {namespace}\n"
+        return code
+
+    def headerText(self):
+        """產生模組的 .h 內容 (只含 FUNC 宣告)"""
+        return "#pragma once\n\n// --- Declarations ---\n" + self.declarations
+
+    def writeHeader(self, headerPath):
+        with open(headerPath, 'w') as writeFile:
+            writeFile.write(self.headerText())
\ No newline at end of file
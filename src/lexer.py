@@ -136,6 +136,9 @@ class Lexer:
         elif self.curChar == '%':
             token = Token(self.curChar, TokenType.MOD)
             self.nextChar()
+        elif self.curChar == '^':
+            token = Token(self.curChar, TokenType.CARET)
+            self.nextChar()
 
         # --- 7. 其他符號 ---
         elif self.curChar == '[':
@@ -153,6 +156,18 @@ class Lexer:
         elif self.curChar == ')':
             token = Token(')', TokenType.RPAREN)
             self.nextChar()
+        elif self.curChar == '{':
+            token = Token('{', TokenType.LBRACE)
+            self.nextChar()
+        elif self.curChar == '}':
+            token = Token('}', TokenType.RBRACE)
+            self.nextChar()
+        elif self.curChar == ':':
+            token = Token(':', TokenType.COLON)
+            self.nextChar()
+        elif self.curChar == '.':
+            token = Token('.', TokenType.DOT)
+            self.nextChar()
         
         elif self.curChar == '=':
             if self.peek() == '=':
@@ -0,0 +1,721 @@
+# src/optimizer.py
+import math
+from src.token import TokenType, BINARY_OPERATORS
+from src.token import PREC_OR, PREC_AND, PREC_NOT, PREC_COMPARE, PREC_SUM, PREC_PRODUCT, PREC_UNARY, PREC_POWER
+
+# 編譯期求值的限制 (避免讓編譯器本身變慢)
+EVAL_STEP_LIMIT = 20000     # 單一呼叫最多執行的步數
+EVAL_TOTAL_LIMIT = 50000    # 整個程式的編譯期求值總步數
+EVAL_DEPTH_LIMIT = 64       # 最大遞迴深度
+INLINE_TOKEN_LIMIT = 40     # 小於此 token 數的 leaf function 標記為 inline
+
+# 遞迴消除: 二元運算子的優先順序，以及可以累積在 stack 上的運算子
+BINARY_PREC = {kind: prec for kind, (prec, _) in BINARY_OPERATORS.items() if prec in (PREC_SUM, PREC_PRODUCT)}
+LINEAR_OPS = {TokenType.PLUS: "+", TokenType.MINUS: "-", TokenType.ASTERISK: "*"}
+
+INT_MIN = -2**31
+INT_MAX = 2**31 - 1
+
+class EvalAbort(Exception):
+    """無法 (或不值得) 在編譯期求值，保留執行期呼叫"""
+    pass
+
+class FuncInfo:
+    def __init__(self, name, params):
+        self.name = name
+        self.params = params
+        self.tokens = []   # 函式本體的 token (由 Parser 記錄)
+        self.calls = []    # 呼叫到的函式名稱 (call graph 的邊)
+        self.done = False  # 已解析到 ENDFUNC
+        self.body = None   # 編譯期求值用的語法樹 (lazy)
+        self.pure = None   # None: 尚未分析
+        self.returns = []  # 本次定義中的 RETURN (遞迴消除用)
+        self.calls_start = 0
+        self.def_params = params # 本次定義的參數 (同名 FUNC 可能有不同的參數個數)
+        self.tokens_start = 0
+
+class Optimizer:
+    """
+    Whole-program pass:
+    1. 由 Parser 記錄的 FUNC 與呼叫點建立 call graph
+    2. 移除 main 無法到達的函式，並將小的 leaf function 標記為 inline
+    3. 對常數引數呼叫純函式 (e.g. fib(20)) 在編譯期求值
+    4. 將自我 tail call 與線性遞迴 (RETURN n + f(n - 1)) 改寫成迴圈
+    """
+    def __init__(self, module=False):
+        self.module = module
+        self.funcs = {}
+        self.spans = []      # (name, start, end): 函式在 emitter.functions 中的位置
+        self.main_calls = []
+        self.budget = EVAL_TOTAL_LIMIT
+        self.memo = {}       # (name, 引數) -> 求值結果；None 表示求值失敗
+
+    # --- Call graph ---
+    def beginFunction(self, name, params, start):
+        if name in self.funcs:
+            # 重複定義: 合併呼叫邊，不做求值
+            info = self.funcs[name]
+            info.pure = False
+        else:
+            info = FuncInfo(name, params)
+            self.funcs[name] = info
+        info.returns = []
+        info.calls_start = len(info.calls)
+        info.def_params = params
+        info.tokens_start = len(info.tokens)
+        self.spans.append([name, start, start])
+        return info
+
+    def endFunction(self, name, end):
+        self.spans[-1][2] = end
+        self.funcs[name].done = True
+
+    def callList(self, current_func):
+        if current_func is None:
+            return self.main_calls
+        return self.funcs[current_func].calls
+
+    def reachable(self):
+        # 模組的 FUNC 都是對外公開的，全部視為根
+        pending = list(self.funcs) if self.module else list(self.main_calls)
+        seen = set()
+        while pending:
+            name = pending.pop()
+            if name in seen or name not in self.funcs:
+                continue
+            seen.add(name)
+            pending.extend(self.funcs[name].calls)
+        return seen
+
+    def optimize(self, emitter):
+        live = self.reachable()
+        inline = set()
+        if not self.module:
+            for name in live:
+                info = self.funcs[name]
+                if not info.calls and len(info.tokens) <= INLINE_TOKEN_LIMIT:
+                    inline.add(name)
+        emitter.rewriteFunctions(self.spans, live, inline)
+
+    # --- Compile-time evaluation ---
+    def fold(self, name, arg_tokens):
+        """回傳呼叫結果的 C++ 常數字串，無法求值時回傳 None"""
+        if self.budget <= 0 or not self.isPure(name, set()):
+            return None
+        evaluator = Evaluator(self)
+        key = None
+        try:
+            args = evaluator.constArgs(arg_tokens)
+            key = memoKey(name, args)
+            if key in self.memo:
+                value = self.memo[key]
+            else:
+                value = evaluator.call(name, args, 0)
+        except (EvalAbort, RecursionError, ZeroDivisionError, OverflowError, ValueError):
+            # 失敗也記下來，同樣的呼叫不再重新求值
+            value = None
+        finally:
+            self.budget -= evaluator.steps
+        if key is not None:
+            self.memo[key] = value
+        return None if value is None else literal(value)
+
+    def isPure(self, name, visiting):
+        info = self.funcs.get(name)
+        if info is None or not info.done:
+            return False
+        if info.pure is not None or name in visiting:
+            return info.pure is not False
+        visiting.add(name)
+        try:
+            info.body = BodyParser(info.tokens).block(())
+            pure = all(self.isPure(callee, visiting) for callee in info.calls)
+        except EvalAbort:
+            pure = False
+        info.pure = pure
+        return pure
+
+    # --- Recursion elimination ---
+    def recordReturn(self, name, start, expr_start, expr_end, end, tokens, call_spans):
+        """記錄 RETURN 在緩衝區中的位置: [start, end) 整行，[expr_start, expr_end) 運算式"""
+        info = self.funcs[name]
+        site = classifyReturn(name, info.def_params, tokens)
+        if site is not None and site[0] != 'base':
+            spans = [span for span in call_spans if span[0] == name]
+            # 引數個數不同時呼叫的是另一個同名的 FUNC
+            if len(spans) != 1 or len(spans[0][3]) != len(info.def_params):
+                site = None
+            else:
+                site = site + (spans[0],)
+        info.returns.append((site, start, expr_start, expr_end, end))
+
+    def eliminateRecursion(self, name, emitter, body_start):
+        """
+        自我遞迴只出現在 RETURN 時改寫成迴圈:
+        - tail call (RETURN f(a, b)): 更新參數後 goto 函式開頭
+        - 線性遞迴 (RETURN e + f(a)): 先把 e 存進 itz_stack，最後由 itz_unwind 依序套用
+        回傳是否使用了 itz_unwind (模組的預設回傳值也要經過它)
+        """
+        info = self.funcs[name]
+        sites = [r for r in info.returns if r[0] is not None and r[0][0] != 'base']
+        if not sites or any(r[0] is None for r in info.returns):
+            return False
+        # 其他地方 (DEF x = f(...) 等) 還有自我呼叫時無法改寫
+        if info.calls[info.calls_start:].count(name) != len(sites):
+            return False
+        # FOR / DEF 重新宣告同名變數時，RETURN 處的名稱不是參數，無法用 goto 更新
+        if rebindsParams(info.tokens[info.tokens_start:], info.def_params):
+            return False
+        linear = {(r[0][1], r[0][2]) for r in sites if r[0][0] == 'linear'}
+        if len(linear) > 1:
+            return False
+        text = emitter.functions if emitter.capture_mode == "functions" else emitter.main
+        unwind = bool(linear)
+        operands = [operandCode(r[0], text, r[2], r[3]) for r in sites if r[0][0] == 'linear']
+        bases = [text[r[2]:r[3]] for r in info.returns if r[0][0] == 'base']
+        # 整數的 + / * 可結合: 直接累積在 itz_acc (O(1) 記憶體)；
+        # 浮點數 (與模組的 double) 仍用 stack，才能維持原本由內而外的運算順序與捨入結果
+        fold = unwind and not self.module and next(iter(linear))[0] in ("+", "*") and bool(bases) and \
+            all(r[0][1] for r in info.returns if r[0][0] == 'base')
+
+        # 由後往前改寫，前面的位置才不會跑掉
+        for site, start, expr_start, expr_end, end in reversed(info.returns):
+            if site[0] == 'base':
+                if unwind:
+                    emitter.replace(expr_start, expr_end, f"itz_unwind({text[expr_start:expr_end]})")
+                continue
+            emitter.replace(start, end, self.tailCall(name, info.def_params, site, text, expr_start, expr_end, unwind, fold))
+
+        prologue = ""
+        if unwind:
+            (op, side), = linear
+            decltypes = ", ".join(f"decltype({operand})" for operand in operands)
+            value_type = "double" if self.module else f"common_type_t<{decltypes}>"
+            step = f"itz_result {op} itz_stack.back()" if side == 'left' else f"itz_stack.back() {op} itz_result"
+            if fold:
+                result_types = ", ".join(f"decltype({base})" for base in bases)
+                prologue += f"    using itz_value_t = {value_type};\n"
+                prologue += f"    constexpr bool itz_fold = is_integral_v<common_type_t<itz_value_t, {result_types}>>;\n"
+                prologue += f"    common_type_t<itz_value_t, {result_types}> itz_acc = {0 if op == '+' else 1};\n"
+                prologue += "    vector<itz_value_t> itz_stack;\n"
+                prologue += "    auto itz_push = [&](itz_value_t itz_value) {\n"
+                prologue += f"        if constexpr (itz_fold) itz_acc = itz_acc {op} itz_value;\n"
+                prologue += "        else itz_stack.push_back(itz_value);\n"
+                prologue += "    };\n"
+                value_type = "itz_value_t"
+            else:
+                prologue += f"    vector<{value_type}> itz_stack;\n"
+            # 結果型態是 base case 與 operand 的 common_type (RETURN 0 + 小數 operand 時不能截成 int)
+            base_type = "double" if self.module else "auto"
+            prologue += f"    auto itz_unwind = [&]({base_type} itz_base) {{\n"
+            prologue += f"        common_type_t<decltype(itz_base), {value_type}> itz_result = itz_base;\n"
+            if fold:
+                accumulate = f"itz_result {op} itz_acc" if side == 'left' else f"itz_acc {op} itz_result"
+                prologue += f"        if constexpr (itz_fold) itz_result = {accumulate};\n"
+            prologue += f"        for (; !itz_stack.empty(); itz_stack.pop_back()) itz_result = {step};\n"
+            prologue += "        return itz_result;\n"
+            prologue += "    };\n"
+        prologue += "itz_tail_call:\n"
+        emitter.replace(body_start, body_start, prologue)
+        emitter.requireRuntime("type_traits", "#include <type_traits>\n")
+        return unwind
+
+    def tailCall(self, name, params, site, text, expr_start, expr_end, unwind, fold):
+        """產生單一遞迴 RETURN 的替代程式碼"""
+        kind, op, side, _, (_, call_start, call_end, arg_spans) = site
+        arg_type = "double" if self.module else "auto"
+        temps = [f"itz_arg{i}" for i in range(len(params))]
+        code = "    {\n"
+        for temp, (arg_start, arg_end) in zip(temps, arg_spans):
+            code += f"        {arg_type} {temp} = ({text[arg_start:arg_end]});\n"
+        jump = ""
+        if kind == 'linear':
+            push = "itz_push" if fold else "itz_stack.push_back"
+            jump += f"{push}({operandCode(site, text, expr_start, expr_end)}); "
+        # 先算完所有引數再更新參數 (f(b, a) 交換參數時才正確)
+        jump += "".join(f"{param} = {temp}; " for param, temp in zip(params, temps))
+        jump += "goto itz_tail_call;"
+        if self.module or not params:
+            code += f"        {jump}\n"
+        else:
+            # auto 參數: 引數型態不同時是另一個 template 實例，維持原本的呼叫
+            same = " && ".join(f"is_same_v<decltype({temp}), decltype({param})>" for param, temp in zip(params, temps))
+            call = text[expr_start:call_start] + f"{name}({', '.join(temps)})" + text[call_end:expr_end]
+            result = f"itz_unwind({call})" if unwind else call
+            code += f"        if constexpr ({same}) {{ {jump} }}\n"
+            code += f"        else {{ return {result}; }}\n"
+        code += "    }\n"
+        return code
+
+def classifyReturn(name, params, tokens):
+    """
+    判斷 RETURN 運算式的形式:
+    ('base', simple)                    沒有自我呼叫 (simple: 型態可以在函式開頭用 decltype 取得)
+    ('tail', None, None, None)          f(...)
+    ('linear', op, 'right', None)       operand op f(...)
+    ('linear', op, 'left', None)        f(...) op operand
+    (operand 的 C++ 程式碼在改寫時才由緩衝區取出)
+    operand 只能用參數、數字與其他函式呼叫 (itz_stack 的型態在函式開頭就要決定)
+    無法處理時回傳 None
+    """
+    tokens = [t for t in tokens if t.kind != TokenType.COMMENT]
+    self_calls = [i for i in range(len(tokens) - 1)
+                  if tokens[i].kind == TokenType.IDENTIFIER and tokens[i].text == name
+                  and tokens[i + 1].kind == TokenType.LPAREN]
+    if not self_calls:
+        return ('base', simpleOperand(tokens, params))
+    if len(self_calls) != 1:
+        return None
+    call = self_calls[0]
+    close = matchParen(tokens, call + 1)
+    if call == 0 and close == len(tokens) - 1:
+        return ('tail', None, None, None)
+
+    if call == 0:
+        # f(...) op operand: operand 內不能有同級或更低的運算子 (f(n) - a - b 是 (f(n) - a) - b)
+        op, operand = tokens[close + 1].kind, tokens[close + 2:]
+        if op not in LINEAR_OPS or any(BINARY_PREC[k] <= BINARY_PREC[op] for k in topLevelOps(operand)):
+            return None
+        side = 'left'
+    elif close == len(tokens) - 1 and call >= 2:
+        # operand op f(...): op 必須是最外層最後一個運算子
+        op, operand = tokens[call - 1].kind, tokens[:call - 1]
+        if op not in LINEAR_OPS or tokens[call - 2].kind in BINARY_PREC:
+            return None # op 是一元運算子 (e.g. n * -f(...))
+        if any(BINARY_PREC[k] < BINARY_PREC[op] for k in topLevelOps(operand)):
+            return None
+        side = 'right'
+    else:
+        return None
+
+    if not simpleOperand(operand, params):
+        return None
+    return ('linear', LINEAR_OPS[op], side, None)
+
+def simpleOperand(tokens, params):
+    """只用參數、數字與函式呼叫的算術運算式"""
+    for i, token in enumerate(tokens):
+        if token.kind == TokenType.IDENTIFIER:
+            is_call = i + 1 < len(tokens) and tokens[i + 1].kind == TokenType.LPAREN
+            if not is_call and token.text not in params:
+                return False
+        elif token.kind not in BINARY_PREC and token.kind not in (
+                TokenType.NUMBER, TokenType.LPAREN, TokenType.RPAREN, TokenType.COMMA):
+            return False
+    return True
+
+def rebindsParams(tokens, params):
+    """函式本體是否以 DEF x = / FOR x = / FOR k, v IN 宣告了與參數同名的變數"""
+    binding = False
+    for token in tokens:
+        kind = token.kind
+        if kind in (TokenType.DEF, TokenType.FOR):
+            binding = True
+        elif binding and kind == TokenType.IDENTIFIER:
+            if token.text in params:
+                return True
+        elif kind != TokenType.COMMA:
+            binding = False
+    return False
+
+def operandCode(site, text, expr_start, expr_end):
+    """線性遞迴中 operand 的 C++ 程式碼 (運算子與呼叫之間沒有空白)"""
+    _, op, side, _, (_, call_start, call_end, _) = site
+    if side == 'left':
+        return text[call_end + len(op):expr_end]
+    return text[expr_start:call_start - len(op)]
+
+def matchParen(tokens, open_index):
+    depth = 0
+    for i in range(open_index, len(tokens)):
+        if tokens[i].kind == TokenType.LPAREN:
+            depth += 1
+        elif tokens[i].kind == TokenType.RPAREN:
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(tokens)
+
+def topLevelOps(tokens):
+    """括號外的二元運算子 (緊接在運算元之後的 + - 才是二元)"""
+    ops = []
+    depth = 0
+    prev = None
+    for token in tokens:
+        kind = token.kind
+        if kind == TokenType.LPAREN:
+            depth += 1
+        elif kind == TokenType.RPAREN:
+            depth -= 1
+        elif depth == 0 and kind in BINARY_PREC and prev is not None and prev not in BINARY_PREC:
+            ops.append(kind)
+        prev = kind
+    return ops
+
+def memoKey(name, args):
+    # 型態也是 key 的一部分: fib(3) (int) 與 fib(3.0) (double) 的 C++ 語意不同；repr 區分 0.0 與 -0.0
+    return (name, tuple((type(a), repr(a)) for a in args))
+
+def literal(value):
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        text = str(value)
+    else:
+        if value != value or value in (float('inf'), float('-inf')):
+            return None
+        text = repr(value)
+    # 負數 (包含 -0.0) 加上括號，避免 1 - (-1) 變成 1--1
+    return f"({text})" if text.startswith('-') else text
+
+class BodyParser:
+    """把 FUNC 本體的 token 轉成語法樹，遇到有副作用的敘述 (ECHO, INPUT, RAND...) 就放棄"""
+    def __init__(self, tokens):
+        self.tokens = [t for t in tokens if t.kind != TokenType.COMMENT]
+        self.pos = 0
+
+    def kind(self):
+        if self.pos >= len(self.tokens):
+            return TokenType.EOF
+        return self.tokens[self.pos].kind
+
+    def text(self):
+        return self.tokens[self.pos].text
+
+    def advance(self):
+        self.pos += 1
+
+    def expect(self, kind):
+        if self.kind() != kind:
+            raise EvalAbort(f"Expected {kind}")
+        self.advance()
+
+    def nl(self):
+        while self.kind() == TokenType.NEWLINE:
+            self.advance()
+
+    def block(self, terminators):
+        stmts = []
+        self.nl()
+        while self.kind() not in terminators:
+            if self.kind() == TokenType.EOF:
+                if terminators:
+                    raise EvalAbort("Unterminated block")
+                break
+            stmts.append(self.statement())
+            self.nl()
+        return stmts
+
+    def statement(self):
+        kind = self.kind()
+        if kind == TokenType.DEF:
+            self.advance()
+            name = self.text()
+            self.expect(TokenType.IDENTIFIER)
+            self.expect(TokenType.EQ)
+            return ('def', name, self.expression())
+
+        elif kind == TokenType.RETURN:
+            self.advance()
+            return ('return', self.expression())
+
+        elif kind == TokenType.IF:
+            # 與 Parser 相同: IF ... [ELSE IF ...] [ELSE ...] ENDIF
+            self.advance()
+            branches = [(self.comparison(), self.thenBlock())]
+            orelse = []
+            if self.kind() == TokenType.ELSE:
+                self.advance()
+                if self.kind() == TokenType.IF:
+                    self.advance()
+                    branches.append((self.comparison(), self.thenBlock()))
+                    if self.kind() == TokenType.ELSE:
+                        self.advance()
+                        orelse = self.block((TokenType.ENDIF,))
+                else:
+                    orelse = self.block((TokenType.ENDIF,))
+            self.expect(TokenType.ENDIF)
+            return ('if', branches, orelse)
+
+        elif kind == TokenType.WHILE:
+            self.advance()
+            cond = self.comparison()
+            self.expect(TokenType.REPEAT)
+            body = self.block((TokenType.ENDWHILE,))
+            self.expect(TokenType.ENDWHILE)
+            return ('while', cond, body)
+
+        elif kind == TokenType.FOR:
+            self.advance()
+            var = self.text()
+            self.expect(TokenType.IDENTIFIER)
+            self.expect(TokenType.EQ)
+            start = self.expression()
+            self.expect(TokenType.TO)
+            end = self.expression()
+            body = self.block((TokenType.NEXT,))
+            self.expect(TokenType.NEXT)
+            return ('for', var, start, end, body)
+
+        elif kind == TokenType.IDENTIFIER:
+            name = self.text()
+            self.advance()
+            if self.kind() == TokenType.EQ:
+                self.advance()
+                return ('assign', name, self.expression())
+            elif self.kind() == TokenType.LPAREN:
+                return ('expr', self.callArgs(name))
+
+        raise EvalAbort(f"Unsupported statement {kind}")
+
+    def thenBlock(self):
+        if self.kind() == TokenType.THEN:
+            self.advance()
+        return self.block((TokenType.ENDIF, TokenType.ELSE))
+
+    def comparison(self):
+        return self.binary(PREC_OR)
+
+    def expression(self):
+        return self.binary(PREC_SUM)
+
+    def binary(self, min_prec):
+        # 與 Parser.binary 相同的 precedence climbing，由 BINARY_OPERATORS 查表
+        node = self.unary(min_prec)
+        compared = False
+        while True:
+            kind = self.kind()
+            op = BINARY_OPERATORS.get(kind)
+            if op is None or op[0] < min_prec:
+                return node
+            prec = op[0]
+            if prec == PREC_COMPARE:
+                if compared:
+                    return node
+                compared = True
+            self.advance()
+            if prec == PREC_POWER:
+                node = ('pow', node, self.binary(PREC_UNARY))
+            elif prec == PREC_COMPARE:
+                node = ('cmp', kind, node, self.binary(prec + 1))
+            elif prec in (PREC_OR, PREC_AND):
+                node = ('or' if prec == PREC_OR else 'and', node, self.binary(prec + 1))
+            else:
+                node = ('bin', kind, node, self.binary(prec + 1))
+
+    def unary(self, min_prec):
+        kind = self.kind()
+        if kind == TokenType.NOT and min_prec <= PREC_NOT:
+            self.advance()
+            return ('not', self.binary(PREC_NOT))
+        if kind in (TokenType.PLUS, TokenType.MINUS) and min_prec <= PREC_UNARY:
+            self.advance()
+            node = self.binary(PREC_POWER)
+            return ('neg', node) if kind == TokenType.MINUS else node
+        return self.primary()
+
+    def primary(self):
+        kind = self.kind()
+        if kind == TokenType.NUMBER:
+            text = self.text()
+            self.advance()
+            value = float(text) if '.' in text else int(text)
+            return ('num', checkInt(value))
+        elif kind == TokenType.IDENTIFIER:
+            name = self.text()
+            self.advance()
+            if self.kind() == TokenType.LPAREN:
+                return self.callArgs(name)
+            if self.kind() == TokenType.LBRACKET:
+                raise EvalAbort("Arrays are not evaluated")
+            return ('var', name)
+        elif kind == TokenType.LPAREN:
+            self.advance()
+            node = self.comparison()
+            self.expect(TokenType.RPAREN)
+            return node
+        raise EvalAbort(f"Unsupported expression {kind}")
+
+    def callArgs(self, name):
+        self.expect(TokenType.LPAREN)
+        args = []
+        if self.kind() != TokenType.RPAREN:
+            args.append(self.expression())
+            while self.kind() == TokenType.COMMA:
+                self.advance()
+                args.append(self.expression())
+        self.expect(TokenType.RPAREN)
+        return ('call', name, args)
+
+def checkInt(value):
+    # C++ 的 int 溢位是 undefined behavior，交給執行期
+    if isinstance(value, int) and not INT_MIN <= value <= INT_MAX:
+        raise EvalAbort("int overflow")
+    return value
+
+def truncDiv(a, b):
+    q = abs(a) // abs(b)
+    return -q if (a < 0) != (b < 0) else q
+
+class Return(Exception):
+    def __init__(self, value):
+        self.value = value
+
+class Evaluator:
+    """依照產生的 C++ 語意 (auto 型態推導、整數除法、% (int)) 執行純函式"""
+    def __init__(self, optimizer):
+        self.optimizer = optimizer
+        self.steps = 0
+
+    def step(self):
+        self.steps += 1
+        if self.steps > EVAL_STEP_LIMIT:
+            raise EvalAbort("Step limit exceeded")
+
+    def constArgs(self, tokens):
+        parser = BodyParser(tokens)
+        args = []
+        if parser.kind() != TokenType.EOF:
+            args.append(parser.expression())
+            while parser.kind() == TokenType.COMMA:
+                parser.advance()
+                args.append(parser.expression())
+        if parser.kind() != TokenType.EOF:
+            raise EvalAbort("Unexpected token in arguments")
+        return [self.eval(arg, [{}], 0) for arg in args]
+
+    def call(self, name, args, depth):
+        if depth > EVAL_DEPTH_LIMIT:
+            raise EvalAbort("Recursion too deep")
+        info = self.optimizer.funcs.get(name)
+        if info is None or info.body is None or len(args) != len(info.params):
+            raise EvalAbort(f"Cannot evaluate {name}")
+        self.step()
+        if self.optimizer.module:
+            args = [float(a) for a in args] # 模組函式參數為 double
+        # 純函式: 同樣的引數必定得到同樣的結果 (e.g. fib 的重複子呼叫)
+        key = memoKey(name, args)
+        memo = self.optimizer.memo
+        if memo.get(key) is not None:
+            return memo[key]
+        scope = dict(zip(info.params, args))
+        try:
+            self.run(info.body, [scope], depth + 1)
+        except Return as r:
+            value = float(r.value) if self.optimizer.module else r.value
+        else:
+            if not self.optimizer.module:
+                raise EvalAbort("Function has no return value")
+            value = 0.0
+        memo[key] = value
+        return value
+
+    def run(self, stmts, scopes, depth):
+        scopes = scopes + [{}]
+        for stmt in stmts:
+            self.step()
+            op = stmt[0]
+            if op == 'def':
+                scopes[-1][stmt[1]] = self.eval(stmt[2], scopes, depth)
+            elif op == 'assign':
+                self.assign(stmt[1], self.eval(stmt[2], scopes, depth), scopes)
+            elif op == 'return':
+                raise Return(self.eval(stmt[1], scopes, depth))
+            elif op == 'expr':
+                self.eval(stmt[1], scopes, depth)
+            elif op == 'if':
+                for cond, body in stmt[1]:
+                    if self.eval(cond, scopes, depth):
+                        self.run(body, scopes, depth)
+                        break
+                else:
+                    self.run(stmt[2], scopes, depth)
+            elif op == 'while':
+                while self.eval(stmt[1], scopes, depth):
+                    self.step()
+                    self.run(stmt[2], scopes, depth)
+            elif op == 'for':
+                # for(auto i = start; i <= end; i++): end 每次都重新計算
+                loop = scopes + [{stmt[1]: self.eval(stmt[2], scopes, depth)}]
+                while loop[-1][stmt[1]] <= self.eval(stmt[3], loop, depth):
+                    self.step()
+                    self.run(stmt[4], loop, depth)
+                    loop[-1][stmt[1]] = checkInt(loop[-1][stmt[1]] + 1)
+
+    def lookup(self, name, scopes):
+        for scope in reversed(scopes):
+            if name in scope:
+                return scope
+        raise EvalAbort(f"Unknown variable {name}")
+
+    def assign(self, name, value, scopes):
+        scope = self.lookup(name, scopes)
+        # 變數型態在 DEF 時就由 auto 決定
+        if isinstance(scope[name], int):
+            value = checkInt(int(value))
+        else:
+            value = float(value)
+        scope[name] = value
+
+    def eval(self, node, scopes, depth):
+        op = node[0]
+        if op == 'num':
+            return node[1]
+        elif op == 'var':
+            return self.lookup(node[1], scopes)[node[1]]
+        elif op == 'neg':
+            return checkInt(-self.eval(node[1], scopes, depth))
+        elif op == 'call':
+            args = [self.eval(arg, scopes, depth) for arg in node[2]]
+            return self.call(node[1], args, depth)
+        elif op == 'and':
+            # C++ 的 && / || 會短路
+            return bool(self.eval(node[1], scopes, depth)) and bool(self.eval(node[2], scopes, depth))
+        elif op == 'or':
+            return bool(self.eval(node[1], scopes, depth)) or bool(self.eval(node[2], scopes, depth))
+        elif op == 'not':
+            return not self.eval(node[1], scopes, depth)
+        elif op == 'pow':
+            # pow() 一律回傳 double (與 C 的 pow 相同，負數的非整數次方等情況交給執行期)
+            a = self.eval(node[1], scopes, depth)
+            b = self.eval(node[2], scopes, depth)
+            return math.pow(float(a), float(b))
+        elif op == 'cmp':
+            a = self.eval(node[2], scopes, depth)
+            b = self.eval(node[3], scopes, depth)
+            kind = node[1]
+            if kind in (TokenType.EQ, TokenType.EQEQ):
+                return a == b
+            elif kind == TokenType.NOTEQ:
+                return a != b
+            elif kind == TokenType.GT:
+                return a > b
+            elif kind == TokenType.GTE:
+                return a >= b
+            elif kind == TokenType.LT:
+                return a < b
+            return a <= b
+
+        kind = node[1]
+        a = self.eval(node[2], scopes, depth)
+        b = self.eval(node[3], scopes, depth)
+        if isinstance(a, bool) or isinstance(b, bool):
+            raise EvalAbort("Boolean arithmetic")
+        if kind == TokenType.PLUS:
+            return checkInt(a + b)
+        elif kind == TokenType.MINUS:
+            return checkInt(a - b)
+        elif kind == TokenType.ASTERISK:
+            return checkInt(a * b)
+        elif kind == TokenType.MOD:
+            # a % (int) b: 左邊必須是整數
+            b = int(b)
+            if not isinstance(a, int) or b == 0:
+                raise EvalAbort("Invalid modulo")
+            return a - b * truncDiv(a, b)
+        # '/' 與 '//' 都輸出為 C++ 的 /
+        if b == 0:
+            raise EvalAbort("Division by zero")
+        if isinstance(a, int) and isinstance(b, int):
+            return truncDiv(a, b)
+        return a / b
@@ -1,12 +1,27 @@
 # src/parser.py
+import os
 import sys
 import re
-from src.token import TokenType
+from src.token import TokenType, BINARY_OPERATORS, PREFIX_OPERATORS
+from src.token import PREC_OR, PREC_NOT, PREC_COMPARE, PREC_SUM, PREC_UNARY, PREC_POWER
+from src.lexer import Lexer
+from src.optimizer import Optimizer
+from src import runtime
 
 class Parser:
-    def __init__(self, lexer, emitter):
+    def __init__(self, lexer, emitter, module=None):
         self.lexer = lexer
         self.emitter = emitter
+        self.module = module # [新增] 模組名稱: 編譯為被 IMPORT 的模組 (沒有 main)
+        self.imports = []    # [新增] IMPORT 的模組路徑 (給 demo.py 建立相依圖)
+        self.optimizer = Optimizer(module=module is not None) # [新增] call graph 與編譯期求值
+        self.current_func = None # 目前正在解析的 FUNC (None 代表 main)
+        self.recorders = []      # 正在記錄 token 的串列 (函式本體 / 呼叫引數)
+        self.dicts = set()       # [新增] 宣告為字典的變數 (m[key] 不做 (int) 轉型)
+        self.call_spans = []     # 目前 RETURN 運算式中的函式呼叫 (名稱, 起點, 終點, 引數位置)
+        self.structs = {}        # [新增] STRUCT 名稱 -> [(欄位, C++ 型態)]
+        self.records = set()     # [新增] 宣告為 record 陣列的變數 (FOR p IN pts)
+        self.vectors = set()     # [新增] DEF x = INPUT[n] 讀入的 vector<double> (傳給 FUNC 時改傳 span)
         self.curToken = None
         self.peekToken = None
         self.nextToken()
@@ -21,6 +36,8 @@ class Parser:
         self.nextToken()
 
     def nextToken(self):
+        for recorder in self.recorders:
+            recorder.append(self.curToken)
         self.curToken = self.peekToken
         self.peekToken = self.lexer.getToken()
 
@@ -35,50 +52,109 @@ class Parser:
         self.emitter.headerLine("#include <cmath>")
         self.emitter.headerLine("using namespace std;")
         
+        # 模組只包含 FUNC / IMPORT / 註解，全部寫入函式緩衝區
+        if self.module:
+            # 引入自己的 .h，讓模組內的 FUNC 不受定義順序限制
+            self.emitter.headerLine(f'#include "{self.module}.h"')
+            self.emitter.setCaptureMode("functions")
+            self.nl()
+            while not self.checkToken(TokenType.EOF):
+                if self.checkToken(TokenType.IMPORT):
+                    self.import_stmt()
+                elif self.checkToken(TokenType.FUNC):
+                    self.func_def()
+                elif self.checkToken(TokenType.COMMENT):
+                    self.statement()
+                else:
+                    sys.exit(f"[Parsing Error] Modules may only contain FUNC, IMPORT and comments, got {self.curToken.kind}")
+            self.optimizer.optimize(self.emitter)
+            return
+
         # 2. 預寫 Main 的開頭到緩衝區
         # 注意：這裡我們手動操作 emitter，因為 main 的內容要在最後才組合
-        self.emitter.main += "int main(void){\n"
+        self.emitter.main += f"int {self.emitter.entry_point}(void){{\n"
         self.emitter.main += "    srand(time(NULL));\n"
 
         while self.checkToken(TokenType.NEWLINE):
             self.nextToken()
 
         while not self.checkToken(TokenType.EOF):
-            if self.checkToken(TokenType.FUNC):
+            if self.checkToken(TokenType.IMPORT):
+                self.import_stmt()
+            elif self.checkToken(TokenType.FUNC):
                 self.emitter.setCaptureMode("functions") # 切換到函式緩衝區
                 self.func_def()
                 self.emitter.setCaptureMode("main")      # 切換回主程式
+            elif self.checkToken(TokenType.STRUCT):
+                # struct 定義寫在函式緩衝區，FUNC 與 main 都能使用
+                self.emitter.setCaptureMode("functions")
+                self.struct_def()
+                self.emitter.setCaptureMode("main")
             else:
                 self.statement()
 
         self.emitter.main += "    return 0;\n"
         self.emitter.main += "}\n"
 
+        # 3. Whole-program pass: 移除用不到的函式、標記 inline
+        self.optimizer.optimize(self.emitter)
+
+    def import_stmt(self):
+        # 語法: IMPORT "lib/mathlib" -> #include "mathlib.h"
+        self.match(TokenType.IMPORT)
+        path = self.curToken.text
+        self.match(TokenType.STRING)
+        if not path.endswith(".itz"):
+            path += ".itz"
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        if path not in self.imports:
+            self.imports.append(path)
+            self.emitter.headerLine(f'#include "{module_name}.h"')
+        self.nl()
+
     def func_def(self):
         self.match(TokenType.FUNC)
         func_name = self.curToken.text
         self.match(TokenType.IDENTIFIER)
         
         # 解析參數: FUNC fib n -> auto fib(auto n)
-        params = []
+        # 模組的函式要跨編譯單元呼叫，不能是 template，因此固定為 double
+        param_type = "double" if self.module else "auto"
+        param_names = []
         while not self.checkToken(TokenType.NEWLINE):
             if self.checkToken(TokenType.IDENTIFIER):
-                params.append(f"auto {self.curToken.text}")
+                param_names.append(self.curToken.text)
                 self.nextToken()
             else:
                 break
         
-        params_str = ", ".join(params)
+        params_str = ", ".join(f"{param_type} {p}" for p in param_names)
+        info = self.optimizer.beginFunction(func_name, param_names, self.emitter.position())
+        self.current_func = func_name
         # C++14 支援 auto 回傳型態推導 (Recursive auto 需要 C++14 以上)
-        self.emitter.emitLine(f"auto {func_name}({params_str}) {{")
+        self.emitter.emitLine(f"{param_type} {func_name}({params_str}) {{")
+        if self.module:
+            self.emitter.declarationLine(f"double {func_name}({params_str});")
+        body_start = self.emitter.position()
         
         self.nl()
         
+        # 記錄函式本體的 token，供編譯期求值使用
+        self.recorders.append(info.tokens)
         while not self.checkToken(TokenType.ENDFUNC):
             self.statement()
+        self.recorders.pop()
+        
+        # 自我 tail call / 線性遞迴改寫成迴圈
+        unwind = self.optimizer.eliminateRecursion(func_name, self.emitter, body_start)
         
         self.match(TokenType.ENDFUNC)
+        if self.module:
+            # 沒有 RETURN 時的預設回傳值
+            self.emitter.emitLine("    return itz_unwind(0);" if unwind else "    return 0;")
         self.emitter.emitLine("}")
+        self.optimizer.endFunction(func_name, self.emitter.position())
+        self.current_func = None
         self.nl()
 
     def statement(self):
@@ -96,7 +172,8 @@ class Parser:
                     if i % 2 == 0:
                         if part: self.emitter.emit(f' << "{part}"')
                     else:
-                        self.emitter.emit(f" << {part}")
+                        self.emitter.emit(" << ")
+                        self.interpolation(part)
                 self.emitter.emitLine(" << endl;")
                 self.match(TokenType.STRING)
             else:
@@ -109,11 +186,29 @@ class Parser:
             name = self.curToken.text
             self.match(TokenType.IDENTIFIER)
             self.match(TokenType.EQ)
+            self.dicts.discard(name)
+            self.records.discard(name)
+            self.vectors.discard(name)
             
-            if self.checkToken(TokenType.STRING):
+            if self.checkToken(TokenType.LBRACE):
+                self.dict_def(name)
+            elif self.checkToken(TokenType.IDENTIFIER) and self.curToken.text in self.structs:
+                self.record_def(name)
+            elif self.checkToken(TokenType.STRING):
                 val = self.curToken.text
                 self.match(TokenType.STRING)
                 self.emitter.emitLine(f'    string {name} = "{val}";')
+            elif self.checkToken(TokenType.INPUT):
+                # 語法: DEF data = INPUT[n] -> 從 stdin 一次讀入 n 個數值到陣列
+                self.match(TokenType.INPUT)
+                self.match(TokenType.LBRACKET)
+                self.emitter.requireRuntime("stdin", runtime.STDIN_READER)
+                self.emitter.emit(f"    vector<double> {name}((size_t)(")
+                self.expression()
+                self.emitter.emitLine("));")
+                self.match(TokenType.RBRACKET)
+                self.emitter.emitLine(f"    itz_in.read({name});")
+                self.vectors.add(name)
             elif self.checkToken(TokenType.LBRACKET):
                 self.match(TokenType.LBRACKET)
                 self.emitter.emit(f"    double {name}[] = {{")
@@ -131,15 +226,41 @@ class Parser:
 
         elif self.checkToken(TokenType.RETURN):
             self.match(TokenType.RETURN)
+            start = self.emitter.position()
             self.emitter.emit("    return ")
+            expr_start = self.emitter.position()
+            expr_tokens = []
+            self.recorders.append(expr_tokens)
+            self.call_spans = []
             self.expression()
+            self.recorders.pop()
+            expr_end = self.emitter.position()
             self.emitter.emitLine(";")
+            if self.current_func is not None:
+                # 記錄 RETURN 的位置，函式結束時再判斷能否消除遞迴
+                self.optimizer.recordReturn(self.current_func, start, expr_start, expr_end,
+                                            self.emitter.position(), expr_tokens, self.call_spans)
 
         elif self.checkToken(TokenType.INPUT):
             self.match(TokenType.INPUT)
             name = self.curToken.text
             self.match(TokenType.IDENTIFIER)
-            self.emitter.emitLine(f"    cin >> {name};")
+            # 使用緩衝讀取器取代 cin (大量輸入時快很多)
+            self.emitter.requireRuntime("stdin", runtime.STDIN_READER)
+            self.emitter.emit("    itz_in.read(")
+            if not (self.checkToken(TokenType.LBRACKET) and self.is_param(name)):
+                self.emitter.emit(name)
+            # INPUT arr[i] / INPUT pts[i].x: 直接讀進元素或欄位
+            if self.checkToken(TokenType.LBRACKET) and self.is_param(name):
+                self.param_subscript("itz_at", name)
+            elif self.checkToken(TokenType.LBRACKET):
+                self.match(TokenType.LBRACKET)
+                self.emitter.emit("[" if name in self.dicts else "[(int)(")
+                self.expression()
+                self.emitter.emit("]" if name in self.dicts else ")]")
+                self.match(TokenType.RBRACKET)
+            self.fields()
+            self.emitter.emitLine(");")
 
         elif self.checkToken(TokenType.IF):
             self.match(TokenType.IF)
@@ -204,13 +325,16 @@ class Parser:
             self.match(TokenType.FOR)
             loop_var = self.curToken.text
             self.match(TokenType.IDENTIFIER)
-            self.match(TokenType.EQ)
-            self.emitter.emit(f"    for(auto {loop_var} = ")
-            self.expression()
-            self.emitter.emit(f"; {loop_var} <= ")
-            self.match(TokenType.TO)
-            self.expression()
-            self.emitter.emit(f"; {loop_var}++) {{")
+            if self.checkToken(TokenType.COMMA) or self.checkToken(TokenType.IN):
+                self.dict_for(loop_var)
+            else:
+                self.match(TokenType.EQ)
+                self.emitter.emit(f"    for(auto {loop_var} = ")
+                self.expression()
+                self.emitter.emit(f"; {loop_var} <= ")
+                self.match(TokenType.TO)
+                self.expression()
+                self.emitter.emit(f"; {loop_var}++) {{")
             self.nl()
             while not self.checkToken(TokenType.NEXT):
                 self.statement()
@@ -228,18 +352,48 @@ class Parser:
                 self.emitter.emit(f"    {name} = ")
                 self.expression()
                 self.emitter.emitLine(";")
+            elif self.checkToken(TokenType.DOT):
+                # 欄位寫入 p.x = value
+                self.emitter.emit(f"    {name}")
+                self.fields()
+                self.match(TokenType.EQ)
+                self.emitter.emit(" = ")
+                self.expression()
+                self.emitter.emitLine(";")
+            elif self.checkToken(TokenType.LBRACKET) and self.is_param(name):
+                # FUNC 參數 d[key] = value (字典或陣列)
+                self.emitter.emit("    ")
+                self.param_subscript("itz_at", name)
+                self.fields()
+                self.match(TokenType.EQ)
+                self.emitter.emit(" = ")
+                self.expression()
+                self.emitter.emitLine(";")
+            elif self.checkToken(TokenType.LBRACKET) and name in self.dicts:
+                # 字典寫入 m[key] = value
+                self.match(TokenType.LBRACKET)
+                self.emitter.emit(f"    {name}[")
+                self.expression()
+                self.emitter.emit("]")
+                self.match(TokenType.RBRACKET)
+                self.match(TokenType.EQ)
+                self.emitter.emit(" = ")
+                self.expression()
+                self.emitter.emitLine(";")
             elif self.checkToken(TokenType.LBRACKET):
                 self.match(TokenType.LBRACKET)
                 self.emitter.emit(f"    {name}[(int)(")
                 self.expression()
                 self.emitter.emit(")]")
                 self.match(TokenType.RBRACKET)
+                self.fields() # pts[i].x = value
                 self.match(TokenType.EQ)
                 self.emitter.emit(" = ")
                 self.expression()
                 self.emitter.emitLine(";")
             elif self.checkToken(TokenType.LPAREN):
                 # 獨立的函式呼叫 fib(n)
+                self.optimizer.callList(self.current_func).append(name)
                 self.match(TokenType.LPAREN)
                 self.emitter.emit(f"    {name}(")
                 if not self.checkToken(TokenType.RPAREN):
@@ -253,6 +407,17 @@ class Parser:
             else:
                  sys.exit(f"[Error] Unexpected identifier usage: {name}")
                  
+        # 語法: DELETE m[key]
+        elif self.checkToken(TokenType.DELETE):
+            self.match(TokenType.DELETE)
+            name = self.curToken.text
+            self.match(TokenType.IDENTIFIER)
+            self.match(TokenType.LBRACKET)
+            self.emitter.emit(f"    {name}.erase(")
+            self.expression()
+            self.match(TokenType.RBRACKET)
+            self.emitter.emitLine(");")
+
         elif self.checkToken(TokenType.FWRITE):
             self.match(TokenType.FWRITE)
             
@@ -332,55 +497,277 @@ class Parser:
 
         self.nl()
 
-    def nl(self):
-        while self.checkToken(TokenType.NEWLINE):
-            self.nextToken()
+    def dict_def(self, name):
+        # 語法: DEF m = {"a": 1, "b": 2} [RESERVE n]，空字典為 {} (數值 -> 數值) 或 {TEXT: NUM}
+        # 轉為 unordered_map；RESERVE 預先配置 bucket，避免大量插入時反覆 rehash
+        self.emitter.requireRuntime("dict", runtime.DICT_HELPERS)
+        self.match(TokenType.LBRACE)
+        self.nl()
+        key_type = value_type = "double"
+        pairs = []
+        if self.checkToken(TokenType.TEXT) or self.checkToken(TokenType.NUM):
+            key_type = self.dict_type()
+            self.match(TokenType.COLON)
+            value_type = self.dict_type()
+        elif not self.checkToken(TokenType.RBRACE):
+            pairs.append(self.dict_pair())
+            while self.checkToken(TokenType.COMMA):
+                self.match(TokenType.COMMA)
+                self.nl()
+                pairs.append(self.dict_pair())
+            # 鍵 / 值型態由第一組決定
+            key_type = f"itz_dict_t<decltype({pairs[0][0]})>"
+            value_type = f"itz_dict_t<decltype({pairs[0][1]})>"
+        self.nl()
+        self.match(TokenType.RBRACE)
 
-    def comparison(self):
+        self.emitter.emitLine(f"    unordered_map<{key_type}, {value_type}> {name};")
+        if self.checkToken(TokenType.RESERVE):
+            self.match(TokenType.RESERVE)
+            self.emitter.emit(f"    {name}.reserve((size_t)(")
+            self.expression()
+            self.emitter.emitLine("));")
+        if pairs:
+            entries = ", ".join(f"{{{key}, {value}}}" for key, value in pairs)
+            self.emitter.emitLine(f"    {name}.insert({{{entries}}});")
+        self.dicts.add(name)
+
+    def dict_type(self):
+        if self.checkToken(TokenType.TEXT):
+            self.match(TokenType.TEXT)
+            return "string"
+        self.match(TokenType.NUM)
+        return "double"
+
+    def dict_pair(self):
+        # 先把 key / value 的 C++ 程式碼取出，稍後組成 insert
+        start = self.emitter.position()
         self.expression()
-        if self.isComparisonOperator():
-            # [特殊處理] 如果是單等號 =，在 C++ 比較中要轉成 ==
-            if self.checkToken(TokenType.EQ):
-                self.emitter.emit("==")
+        key = self.emitter.take(start)
+        self.match(TokenType.COLON)
+        self.expression()
+        value = self.emitter.take(start)
+        self.nl()
+        return key, value
+
+    def dict_for(self, key_var):
+        # 語法: FOR key IN m 或 FOR key, value IN m (value 可修改字典內的值)
+        value_var = f"itz_{key_var}_value"
+        if self.checkToken(TokenType.COMMA):
+            self.match(TokenType.COMMA)
+            value_var = self.curToken.text
+            self.match(TokenType.IDENTIFIER)
+        self.match(TokenType.IN)
+        name = self.curToken.text
+        self.match(TokenType.IDENTIFIER)
+        if name in self.records and value_var == f"itz_{key_var}_value":
+            # FOR p IN pts: 依序走訪 record 陣列 (p 為參考，可修改欄位)
+            self.emitter.emit(f"    for(auto &{key_var} : {name}) {{")
+            return
+        self.emitter.emit(f"    for(auto &[{key_var}, {value_var}] : {name}) {{")
+
+    def struct_def(self):
+        """
+        語法:
+        STRUCT Particle
+            x = 0.0        # 由預設值推斷型態 (字串 -> string，其他 -> double)
+            NUM mass       # 宣告型態: NUM / TEXT / 已定義的 STRUCT
+            TEXT label = "p"
+        ENDSTRUCT
+        """
+        self.match(TokenType.STRUCT)
+        name = self.curToken.text
+        self.match(TokenType.IDENTIFIER)
+        if name in self.structs:
+            sys.exit(f"[Parsing Error] Struct '{name}' is already defined")
+        fields = []
+        self.emitter.emitLine(f"struct {name} {{")
+        self.nl()
+        while not self.checkToken(TokenType.ENDSTRUCT):
+            if self.checkToken(TokenType.COMMENT):
+                self.emitter.emitLine("    " + self.curToken.text)
                 self.nextToken()
+                self.nl()
+                continue
+
+            if self.checkToken(TokenType.NUM) or self.checkToken(TokenType.TEXT) or \
+                    (self.checkToken(TokenType.IDENTIFIER) and self.peekToken.kind == TokenType.IDENTIFIER):
+                field_type = self.field_type()
+                field = self.curToken.text
+                self.match(TokenType.IDENTIFIER)
             else:
-                self.emitter.emit(self.curToken.text)
-                self.nextToken()
+                field = self.curToken.text
+                self.match(TokenType.IDENTIFIER)
+                if not self.checkToken(TokenType.EQ):
+                    sys.exit(f"[Parsing Error] Field '{field}' of struct '{name}' needs a type or a default value")
+                field_type = "string" if self.peekToken.kind == TokenType.STRING else "double"
+
+            if any(field == f for f, _ in fields):
+                sys.exit(f"[Parsing Error] Duplicate field '{field}' in struct '{name}'")
+            fields.append((field, field_type))
+
+            if self.checkToken(TokenType.EQ):
+                self.match(TokenType.EQ)
+                self.emitter.emit(f"    {field_type} {field} = ")
+                self.expression()
+                self.emitter.emitLine(";")
+            elif field_type == "double":
+                self.emitter.emitLine(f"    double {field} = 0;")
+            else:
+                self.emitter.emitLine(f"    {field_type} {field};")
+            self.nl()
+        self.match(TokenType.ENDSTRUCT)
+        self.emitter.emitLine("};")
+        self.structs[name] = fields
+        self.nl()
+
+    def field_type(self):
+        if self.checkToken(TokenType.NUM):
+            self.nextToken()
+            return "double"
+        if self.checkToken(TokenType.TEXT):
+            self.nextToken()
+            return "string"
+        name = self.curToken.text
+        if name not in self.structs:
+            sys.exit(f"[Parsing Error] Unknown field type: {name}")
+        self.match(TokenType.IDENTIFIER)
+        return name
+
+    def record_def(self, name):
+        # DEF p = Point(1, 2)  -> Point p{1, 2};   (依欄位順序初始化，沒給的欄位用預設值)
+        # DEF pts = Point[n]   -> vector<Point> pts((size_t)(n));   (連續存放的 record 陣列)
+        struct = self.curToken.text
+        self.match(TokenType.IDENTIFIER)
+        if self.checkToken(TokenType.LBRACKET):
+            self.match(TokenType.LBRACKET)
+            self.emitter.emit(f"    vector<{struct}> {name}((size_t)(")
             self.expression()
+            self.emitter.emitLine("));")
+            self.match(TokenType.RBRACKET)
+            self.records.add(name)
+            return
+        self.emitter.emit(f"    {struct} {name}{{")
+        if self.checkToken(TokenType.LPAREN):
+            self.match(TokenType.LPAREN)
+            fields = self.structs[struct]
+            count = 0
+            while not self.checkToken(TokenType.RPAREN):
+                if count:
+                    self.emitter.emit(", ")
+                    self.match(TokenType.COMMA)
+                if count == len(fields):
+                    sys.exit(f"[Parsing Error] Too many values for struct '{struct}' ({len(fields)} fields)")
+                # 轉成欄位的型態: {} 初始化不允許 int -> double 的 narrowing
+                self.emitter.emit(f"({fields[count][1]})(")
+                self.expression()
+                self.emitter.emit(")")
+                count += 1
+            self.match(TokenType.RPAREN)
+        self.emitter.emitLine("};")
 
-    def isComparisonOperator(self):
-        return self.checkToken(TokenType.GT) or self.checkToken(TokenType.GTE) or \
-               self.checkToken(TokenType.LT) or self.checkToken(TokenType.LTE) or \
-               self.checkToken(TokenType.EQEQ) or self.checkToken(TokenType.NOTEQ) or \
-               self.checkToken(TokenType.EQ)  # <--- [新增] 讓單等號也能當比較運算符
+    def interpolation(self, source):
+        # ECHO "...`運算式`..." 的運算式也交給 expression() 解析:
+        # 字典讀取、call graph 與編譯期求值都和一般運算式相同
+        saved = (self.lexer, self.curToken, self.peekToken, self.recorders)
+        self.lexer = Lexer(source)
+        self.recorders = []
+        self.nextToken()
+        self.nextToken()
+        self.expression()
+        if not self.checkToken(TokenType.NEWLINE):
+            sys.exit(f"[Parsing Error] Unexpected token in ECHO interpolation `{source}`: {self.curToken.kind}")
+        self.lexer, self.curToken, self.peekToken, self.recorders = saved
 
-    def expression(self):
-        self.term()
-        while self.checkToken(TokenType.PLUS) or self.checkToken(TokenType.MINUS):
-            self.emitter.emit(self.curToken.text)
+    def is_param(self, name):
+        # 一般程式的 FUNC 參數是 auto: 解析時不知道傳進來的是陣列、record 陣列還是字典
+        if self.module or self.current_func is None:
+            return False
+        return name in self.optimizer.funcs[self.current_func].def_params
+
+    def param_subscript(self, helper, name):
+        # d[key] -> itz_get(d, key) (讀取) / itz_at(d, key) (寫入)，由 runtime 依型態選擇字典查詢或 (int) 索引
+        self.emitter.requireRuntime("dict", runtime.DICT_HELPERS)
+        self.match(TokenType.LBRACKET)
+        self.emitter.emit(f"{helper}({name}, ")
+        self.expression()
+        self.emitter.emit(")")
+        self.match(TokenType.RBRACKET)
+
+    def argument(self):
+        # 字典 (view) 與 vector (span) 以參考傳入 FUNC: auto 參數會複製整個容器，函式內的修改會遺失
+        name = self.curToken.text
+        vector = name in self.records or name in self.vectors
+        if self.checkToken(TokenType.IDENTIFIER) and (name in self.dicts or vector) and \
+                self.peekToken.kind in (TokenType.COMMA, TokenType.RPAREN):
+            if vector:
+                self.emitter.requireRuntime("vector_ref", runtime.VECTOR_REF)
+            self.emitter.emit(f"itz_ref({name})")
             self.nextToken()
-            self.term()
+        else:
+            self.expression()
 
-    def term(self):
-        self.unary()
-        while self.checkToken(TokenType.ASTERISK) or self.checkToken(TokenType.SLASH) or \
-              self.checkToken(TokenType.MOD) or self.checkToken(TokenType.DOUBLESLASH):
-            if self.checkToken(TokenType.MOD):
-                self.nextToken()
-                self.emitter.emit(" % (int) ") 
-            elif self.checkToken(TokenType.DOUBLESLASH):
-                self.nextToken()
-                self.emitter.emit(" / ")
+    def fields(self):
+        # 欄位存取: .x (可連續，e.g. p.pos.x)
+        while self.checkToken(TokenType.DOT):
+            self.match(TokenType.DOT)
+            self.emitter.emit(f".{self.curToken.text}")
+            self.match(TokenType.IDENTIFIER)
+
+    def nl(self):
+        while self.checkToken(TokenType.NEWLINE):
+            self.nextToken()
+
+    def comparison(self):
+        # 條件 (IF / WHILE): 可以使用比較與 AND / OR / NOT
+        self.binary(PREC_OR)
+
+    def expression(self):
+        # 算術運算式: 比較與邏輯運算子不屬於運算式 (遇到時停下)
+        self.binary(PREC_SUM)
+
+    def binary(self, min_prec):
+        """
+        Precedence climbing: 解析優先順序 >= min_prec 的運算式，運算子由 BINARY_OPERATORS 查表
+        """
+        start = self.emitter.position()
+        self.unary(min_prec)
+        compared = False
+        while True:
+            op = BINARY_OPERATORS.get(self.curToken.kind)
+            if op is None or op[0] < min_prec:
+                break
+            prec, code = op
+            if prec == PREC_COMPARE:
+                # 比較不能連續 (a < b < c)
+                if compared:
+                    break
+                compared = True
+            self.nextToken()
+            if prec == PREC_POWER:
+                # a ^ b -> pow(a, b)，右結合: 2 ^ 3 ^ 2 = 2 ^ 9
+                base = self.emitter.take(start)
+                self.emitter.emit(f"pow({base}, ")
+                self.binary(PREC_UNARY)
+                self.emitter.emit(")")
             else:
-                self.emitter.emit(self.curToken.text)
-                self.nextToken()
-            self.unary()
+                self.emitter.emit(code)
+                self.binary(prec + 1)
 
-    def unary(self):
-        if self.checkToken(TokenType.PLUS) or self.checkToken(TokenType.MINUS):
-            self.emitter.emit(self.curToken.text)
-            self.nextToken()        
-        self.primary()
+    def unary(self, min_prec):
+        kind = self.curToken.kind
+        if kind == TokenType.NOT and min_prec <= PREC_NOT:
+            self.nextToken()
+            self.emitter.emit("!(")
+            self.binary(PREC_NOT)
+            self.emitter.emit(")")
+        elif kind in PREFIX_OPERATORS and min_prec <= PREC_UNARY:
+            # 只允許一個正負號 (--a 在 C++ 是遞減)
+            self.emitter.emit(PREFIX_OPERATORS[kind])
+            self.nextToken()
+            self.binary(PREC_POWER)
+        else:
+            self.primary()
 
     def primary(self):
         if self.checkToken(TokenType.NUMBER):
@@ -393,17 +780,52 @@ class Parser:
             
             # 函式呼叫 fib(n)
             if self.checkToken(TokenType.LPAREN):
+                start = self.emitter.position()
+                calls = self.optimizer.callList(self.current_func)
+                num_calls = len(calls)
+                num_spans = len(self.call_spans)
                 self.match(TokenType.LPAREN)
                 self.emitter.emit(f"{name}(")
+                arg_tokens = []
+                arg_spans = [] # 每個引數的 C++ 程式碼位置 (tail call 改寫用)
+                self.recorders.append(arg_tokens)
                 if not self.checkToken(TokenType.RPAREN):
-                    self.expression()
+                    arg_start = self.emitter.position()
+                    self.argument()
+                    arg_spans.append((arg_start, self.emitter.position()))
                     while self.checkToken(TokenType.COMMA):
                         self.emitter.emit(", ")
                         self.match(TokenType.COMMA)
-                        self.expression()
+                        arg_start = self.emitter.position()
+                        self.argument()
+                        arg_spans.append((arg_start, self.emitter.position()))
+                self.recorders.pop()
                 self.match(TokenType.RPAREN)
                 self.emitter.emit(")")
+
+                # 純函式 + 常數引數: 在編譯期求值 (e.g. fib(20) -> 6765)
+                value = self.optimizer.fold(name, arg_tokens)
+                if value is not None:
+                    self.emitter.rewind(start)
+                    self.emitter.emit(value)
+                    del calls[num_calls:] # 引數中的呼叫也一併消失
+                    del self.call_spans[num_spans:]
+                else:
+                    calls.append(name)
+                    self.call_spans.append((name, start, self.emitter.position(), arg_spans))
             
+            # 型態未知的 FUNC 參數 d[key]: 字典或陣列都可以
+            elif self.checkToken(TokenType.LBRACKET) and self.is_param(name):
+                self.param_subscript("itz_get", name)
+
+            # 字典讀取 m[key] (不存在時為預設值)
+            elif self.checkToken(TokenType.LBRACKET) and name in self.dicts:
+                self.match(TokenType.LBRACKET)
+                self.emitter.emit(f"itz_get({name}, ")
+                self.expression()
+                self.emitter.emit(")")
+                self.match(TokenType.RBRACKET)
+
             # 陣列存取 arr[i]
             elif self.checkToken(TokenType.LBRACKET):
                 self.match(TokenType.LBRACKET)
@@ -413,6 +835,7 @@ class Parser:
                 self.match(TokenType.RBRACKET)
             else:
                 self.emitter.emit(name)
+            self.fields() # p.x / pts[i].x
 
         # [新增] 支援字串表達式
         elif self.checkToken(TokenType.STRING):
@@ -423,11 +846,24 @@ class Parser:
         elif self.checkToken(TokenType.RAND):
             self.match(TokenType.RAND)
             self.emitter.emit("rand()")
+
+        # 語法: HAS(m, key) -> 字典是否有這個鍵
+        elif self.checkToken(TokenType.HAS):
+            self.match(TokenType.HAS)
+            self.match(TokenType.LPAREN)
+            name = self.curToken.text
+            self.match(TokenType.IDENTIFIER)
+            self.match(TokenType.COMMA)
+            self.emitter.emit(f"{name}.contains(")
+            self.expression()
+            self.emitter.emit(")")
+            self.match(TokenType.RPAREN)
         
         elif self.checkToken(TokenType.LPAREN):
+            # 括號內可以是條件: NOT (a > 1 AND b < 0)、(a OR b) AND c
             self.match(TokenType.LPAREN)
             self.emitter.emit("(")
-            self.expression()
+            self.binary(PREC_OR)
             self.emitter.emit(")")
             self.match(TokenType.RPAREN)
 
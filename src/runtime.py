@@ -0,0 +1,190 @@
+# src/runtime.py
+# 產生的 C++ 程式所需的輔助程式碼 (runtime)，由 Emitter.requireRuntime 按需加入
+
+# INPUT 使用的緩衝 stdin 讀取器:
+# - 一次 read() 一大塊 (對終端機而言是一行)，不會為了填滿緩衝區而卡住互動程式
+# - 讀取前先 flush cout，ECHO 的提示一定會先出現
+# - itz_in 是 inline 變數，多個編譯單元 (模組) 連結後仍是同一個物件，不會各自吃掉一塊輸入
+# - 整數 / 字串自行解析；浮點數走 Clinger fast path (mantissa < 2^53, |exp| <= 22 時結果精確)，其餘交給 strtod
+STDIN_READER = r'''
+// --- Runtime: buffered stdin reader (INPUT) ---
+#include <cstdio>
+#include <cstdint>
+#ifdef _WIN32
+#include <io.h>
+#define itz_read_fd ::_read
+#else
+#include <unistd.h>
+#define itz_read_fd ::read
+#endif
+
+struct ItzInput {
+    static const int SIZE = 1 << 16;
+    char buf[SIZE];
+    int pos = 0, len = 0;
+
+    bool fill() {
+        cout.flush();
+        pos = 0;
+        len = itz_read_fd(0, buf, SIZE);
+        if (len < 0) len = 0;
+        return len > 0;
+    }
+    int peek() {
+        if (pos == len && !fill()) return EOF;
+        return (unsigned char)buf[pos];
+    }
+    static bool isSpace(int c) { return c == ' ' || c == '\n' || c == '\t' || c == '\r' || c == '\v' || c == '\f'; }
+    void skipSpace() {
+        int c;
+        while ((c = peek()) != EOF && isSpace(c)) pos++;
+    }
+    // 讀取下一個以空白分隔的 token
+    void token(string &s) {
+        skipSpace();
+        s.clear();
+        int c;
+        while ((c = peek()) != EOF && !isSpace(c)) {
+            int start = pos;
+            while (pos < len && !isSpace((unsigned char)buf[pos])) pos++;
+            s.append(buf + start, pos - start);
+        }
+    }
+
+    void read(string &s) { token(s); }
+
+    template <typename T>
+    void readInt(T &x) {
+        skipSpace();
+        bool neg = false;
+        int c = peek();
+        if (c == '-' || c == '+') { neg = (c == '-'); pos++; c = peek(); }
+        T value = 0;
+        while (c >= '0' && c <= '9') {
+            value = value * 10 + (c - '0');
+            pos++;
+            c = peek();
+        }
+        // INPUT 到整數變數卻輸入小數時捨去小數部分 (cin 會讓之後的讀取全部失敗)
+        if (c == '.') {
+            pos++;
+            while ((c = peek()) >= '0' && c <= '9') pos++;
+        }
+        x = neg ? -value : value;
+    }
+    void read(int &x) { readInt(x); }
+    void read(long &x) { readInt(x); }
+    void read(long long &x) { readInt(x); }
+
+    void read(double &x) {
+        static const double pow10[] = {1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10, 1e11,
+                                       1e12, 1e13, 1e14, 1e15, 1e16, 1e17, 1e18, 1e19, 1e20, 1e21, 1e22};
+        // 直接從緩衝區取出 token (不配置記憶體)，過長的 token 交給 strtod
+        char text[64];
+        int n = 0, c;
+        string longText;
+        skipSpace();
+        while ((c = peek()) != EOF && !isSpace(c)) {
+            if (n == 63) { longText.append(text, n); n = 0; }
+            text[n++] = (char)c;
+            pos++;
+        }
+        text[n] = '\0';
+        if (!longText.empty()) {
+            longText.append(text, n);
+            x = strtod(longText.c_str(), nullptr);
+            return;
+        }
+        const char *p = text;
+        bool neg = false;
+        if (*p == '-' || *p == '+') neg = (*p++ == '-');
+        uint64_t mant = 0;
+        int digits = 0, exp = 0;
+        bool any = false;
+        for (; *p >= '0' && *p <= '9'; p++, any = true) {
+            if (digits < 19) { mant = mant * 10 + (*p - '0'); if (mant) digits++; } else exp++;
+        }
+        if (*p == '.') {
+            for (p++; *p >= '0' && *p <= '9'; p++, any = true) {
+                if (digits < 19) { mant = mant * 10 + (*p - '0'); if (mant) digits++; exp--; }
+            }
+        }
+        if (any && *p == '\0' && mant < (1ULL << 53) && exp >= -22 && exp <= 22) {
+            double value = (double)mant;
+            value = exp < 0 ? value / pow10[-exp] : value * pow10[exp];
+            x = neg ? -value : value;
+        } else {
+            x = strtod(text, nullptr);
+        }
+    }
+    void read(float &x) { double d; read(d); x = (float)d; }
+
+    // DEF data = INPUT[n]: 一次讀入 n 個值
+    template <typename T>
+    void read(vector<T> &values) {
+        for (auto &value : values) read(value);
+    }
+};
+// inline 變數: 主程式與 IMPORT 的模組共用同一個讀取器 (同一個緩衝區)
+inline ItzInput itz_in;
+'''
+
+# 字典 (DEF m = {...}) 使用的輔助程式碼
+DICT_HELPERS = r'''
+// --- Runtime: dictionary helpers ---
+#include <unordered_map>
+#include <type_traits>
+
+// 字典的鍵 / 值型態: 字串 -> string，其他 -> double
+template <typename T>
+using itz_dict_t = conditional_t<is_convertible_v<T, string>, string, double>;
+
+template <typename M>
+concept itz_dict_like = requires { typename remove_cvref_t<M>::mapped_type; };
+
+// m[key] 的讀取: 不存在的鍵回傳預設值，不會插入新元素
+// FUNC 參數的型態在解析時未知，陣列 / record 陣列也經過這裡 (以 (int) 索引，回傳元素的參考)
+template <typename M, typename K>
+decltype(auto) itz_get(M &&m, const K &key) {
+    if constexpr (itz_dict_like<M>) {
+        auto it = m.find(key);
+        return it == m.end() ? typename remove_cvref_t<M>::mapped_type() : it->second;
+    } else {
+        return m[(int)(key)];
+    }
+}
+
+// FUNC 參數的 m[key] = value: 字典插入 / 覆寫，陣列以 (int) 索引
+template <typename M, typename K>
+decltype(auto) itz_at(M &&m, const K &key) {
+    if constexpr (itz_dict_like<M>) return m[key];
+    else return m[(int)(key)];
+}
+
+// 傳給 FUNC 的字典: auto 參數會複製整個 unordered_map，改傳指向原本字典的 view
+template <typename M>
+struct itz_dict_ref {
+    using key_type = typename M::key_type;
+    using mapped_type = typename M::mapped_type;
+    M *m;
+    mapped_type &operator[](const key_type &key) const { return (*m)[key]; }
+    auto find(const key_type &key) const { return m->find(key); }
+    auto begin() const { return m->begin(); }
+    auto end() const { return m->end(); }
+    bool contains(const key_type &key) const { return m->contains(key); }
+    size_t erase(const key_type &key) const { return m->erase(key); }
+    size_t size() const { return m->size(); }
+};
+
+template <typename K, typename V>
+itz_dict_ref<unordered_map<K, V>> itz_ref(unordered_map<K, V> &m) { return {&m}; }
+'''
+
+# record 陣列與 DEF x = INPUT[n] (vector) 傳給 FUNC 時改傳 span: auto 參數會複製整個 vector，函式內的修改會遺失
+VECTOR_REF = r'''
+// --- Runtime: vector arguments ---
+#include <span>
+
+template <typename T>
+span<T> itz_ref(vector<T> &v) { return v; }
+'''
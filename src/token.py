@@ -31,11 +31,35 @@ class TokenType(Enum):
     ENDFUNC = 'ENDFUNC'
     RETURN = 'RETURN'
 
+    # [新增] 模組匯入
+    IMPORT = 'IMPORT'
+
+    # [新增] 字典 (hash map)
+    RESERVE = 'RESERVE'
+    HAS = 'HAS'
+    DELETE = 'DELETE'
+    IN = 'IN'
+    TEXT = 'TEXT'  # 空字典的型態提示: {TEXT: NUM}
+    NUM = 'NUM'
+
+    # [新增] 結構 (record)
+    STRUCT = 'STRUCT'
+    ENDSTRUCT = 'ENDSTRUCT'
+
+    # [新增] 邏輯運算
+    AND = 'AND'
+    OR = 'OR'
+    NOT = 'NOT'
+
     # 符號
     LBRACKET = 'LBRACKET' # [
     RBRACKET = 'RBRACKET' # ]
     LPAREN = 'LPAREN'     # (
     RPAREN = 'RPAREN'     # )
+    LBRACE = 'LBRACE'     # {
+    RBRACE = 'RBRACE'     # }
+    COLON = 'COLON'       # :
+    DOT = 'DOT'           # . 欄位存取
     COMMA = 'COMMA'       
     
     # 運算
@@ -46,6 +70,7 @@ class TokenType(Enum):
     SLASH = 'SLASH'
     DOUBLESLASH = 'DOUBLESLASH'
     MOD = 'MOD'   
+    CARET = 'CARET' # ^ 次方
     
     # 比較
     EQEQ = 'EQEQ'
@@ -60,6 +85,30 @@ class TokenType(Enum):
     FREAD = 'FREAD'
     FAPPEND = 'FAPPEND'
 
+# [新增] 運算子優先順序 (數字越大越緊密)，Parser 與 Optimizer 共用
+PREC_OR, PREC_AND, PREC_NOT, PREC_COMPARE, PREC_SUM, PREC_PRODUCT, PREC_UNARY, PREC_POWER = range(1, 9)
+
+# 二元運算子: TokenType -> (優先順序, C++ 程式碼)
+BINARY_OPERATORS = {
+    TokenType.OR: (PREC_OR, " || "),
+    TokenType.AND: (PREC_AND, " && "),
+    TokenType.EQ: (PREC_COMPARE, "=="), # 比較中的單等號 = 轉成 ==
+    TokenType.EQEQ: (PREC_COMPARE, "=="),
+    TokenType.NOTEQ: (PREC_COMPARE, "!="), # <> 與 != 都輸出為 !=
+    TokenType.LT: (PREC_COMPARE, "<"),
+    TokenType.LTE: (PREC_COMPARE, "<="),
+    TokenType.GT: (PREC_COMPARE, ">"),
+    TokenType.GTE: (PREC_COMPARE, ">="),
+    TokenType.PLUS: (PREC_SUM, "+"),
+    TokenType.MINUS: (PREC_SUM, "-"),
+    TokenType.ASTERISK: (PREC_PRODUCT, "*"),
+    TokenType.SLASH: (PREC_PRODUCT, "/"),
+    TokenType.DOUBLESLASH: (PREC_PRODUCT, " / "),
+    TokenType.MOD: (PREC_PRODUCT, " % (int) "),
+    TokenType.CARET: (PREC_POWER, None), # pow(a, b)
+}
+PREFIX_OPERATORS = {TokenType.PLUS: "+", TokenType.MINUS: "-"}
+
 class Token:
     def __init__(self, token_text, token_kind):
         self.text = token_text